@@ -0,0 +1,188 @@
+"""
+종목 간 로그 수익률 상관행렬.
+
+상관행렬은 구간 안의 수익률 합(S)과 교차곱 행렬(C = RᵀR)로부터 계산합니다.
+처음에는 np.corrcoef와 같은 BLAS 행렬 곱 한 번으로 만들고, 새 봉이 붙어 구간이 밀리면
+들어온 행과 빠진 행의 교차곱만 더하고 빼서 갱신합니다.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+# 캐시 전체가 사용할 수 있는 최대 메모리 (바이트). 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 구간을 이만큼 밀 때마다 한 번은 처음부터 다시 계산해 누적 오차가 쌓이지 않게 합니다.
+RECOMPUTE_EVERY = 250
+
+
+def log_returns(close):
+    """(날짜 x 티커) 종가 배열의 로그 수익률 (행이 하나 적음)."""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(close[1:] / close[:-1])
+
+
+def correlation_from_sums(count, sums, cross):
+    """수익률 개수, 티커별 합, 교차곱 행렬로부터 상관행렬을 계산합니다."""
+    covariance = cross - np.outer(sums, sums) / count
+    std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(std, std)
+    np.fill_diagonal(correlation, 1.0)
+    return np.clip(correlation, -1.0, 1.0)
+
+
+def cluster_order(correlation, method="average"):
+    """
+    상관관계가 비슷한 종목끼리 붙어 있도록 하는 계층적 군집 순서 (열 번호 배열).
+    거리 sqrt((1 - ρ) / 2)로 군집을 만듭니다. scipy가 필요합니다.
+    """
+    from scipy.cluster.hierarchy import leaves_list, linkage # 군집 순서를 쓸 때만 scipy를 불러옵니다.
+    from scipy.spatial.distance import squareform
+
+    if len(correlation) < 3:
+        return np.arange(len(correlation))
+    distance = np.sqrt(np.clip((1 - np.nan_to_num(correlation)) / 2, 0, None))
+    np.fill_diagonal(distance, 0)
+    return leaves_list(linkage(squareform(distance, checks=False), method=method))
+
+
+class CorrelationCache:
+    """
+    (이름 공간, 종목 구성, 구간 길이)별 상관행렬 LRU 캐시.
+    구간에 쓰인 종가 행만 보관하고, 새 종가가 그 뒷부분과 겹치고 뒤에 새 봉만 붙었으면
+    (날이 바뀌어 전체 기간의 시작일이 밀린 경우 포함) 합과 교차곱을 이어서 갱신합니다.
+    window=None이면 전체 기간을 사용합니다.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, namespace, close_prices, window=None):
+        """
+        (상관행렬, 포함된 열 번호)를 돌려줍니다.
+        구간 안에 빈 값(상장 전 등)이 있는 종목은 상관행렬에서 빠집니다.
+        """
+        key = (namespace, tuple(close_prices.columns), window)
+        index = close_prices.index
+        close = close_prices.to_numpy(dtype=np.float64)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total_bytes -= entry["nbytes"]
+                entry = self._advance(entry, index, close, window)
+            if entry is None:
+                entry = self._compute(index, close, window)
+            self._entries[key] = entry
+            self._total_bytes += entry["nbytes"]
+            self._evict()
+        return entry["correlation"], entry["columns"]
+
+    def _window_rows(self, num_rows, window):
+        """마지막 window개 수익률을 만드는 종가 행 범위의 시작 (종가는 window + 1행 필요)."""
+        return 0 if window is None else max(0, num_rows - window - 1)
+
+    def _compute(self, index, close, window):
+        window_start = self._window_rows(len(close), window)
+        window_close = close[window_start:]
+        returns = log_returns(window_close)
+        columns = np.flatnonzero(~np.isnan(returns).any(axis=0))
+        returns = returns[:, columns]
+        sums = returns.sum(axis=0)
+        cross = returns.T @ returns # 상관행렬 전체를 BLAS 행렬 곱 한 번으로 계산합니다.
+        return self._entry(index[window_start:], window_close, columns, len(returns), sums, cross, updates=0)
+
+    def _align(self, old_index, index):
+        """
+        저장된 구간의 old_index[a:]가 새 index[b:]의 앞부분과 같으면 (a, b)를, 그렇지 않으면 None을 돌려줍니다.
+        구간 시작일이 밀려도 저장된 구간의 뒷부분과 새 종가가 겹치기만 하면 이어서 갱신할 수 있습니다.
+        """
+        if len(index) == 0 or len(old_index) == 0:
+            return None
+        if index[0] >= old_index[0]:
+            a, b = old_index.searchsorted(index[0]), 0
+            if a >= len(old_index) or old_index[a] != index[0]:
+                return None
+        else:
+            a, b = 0, index.searchsorted(old_index[0])
+            if b >= len(index) or index[b] != old_index[0]:
+                return None
+        overlap = len(old_index) - a
+        if b + overlap > len(index) or not index[b:b + overlap].equals(old_index[a:]):
+            return None
+        return a, b
+
+    def _advance(self, entry, index, close, window):
+        """저장된 구간 뒤에 새 봉만 붙었으면 구간을 밀어 갱신한 항목을, 그렇지 않으면 None을 돌려줍니다."""
+        old_index, old_close = entry["index"], entry["close"]
+        alignment = self._align(old_index, index)
+        if alignment is None:
+            return None
+        a, b = alignment
+        old_end = b + len(old_index) - a # 새 종가에서 저장된 구간이 끝나는 위치
+        window_start = self._window_rows(len(index), window)
+        num_dropped = a + window_start - b # 저장된 구간 앞에서 빠지는 종가 행 수 (= 빠지는 수익률 수)
+        num_new = len(index) - old_end
+        if num_dropped < 0 or num_dropped >= len(old_close):
+            return None # 구간이 앞으로 늘었거나 저장된 구간과 겹치는 수익률이 없으면 처음부터 다시 계산합니다.
+        if num_dropped == 0 and num_new == 0:
+            return entry
+        if entry["updates"] + num_new + num_dropped > RECOMPUTE_EVERY or (window is not None and num_new >= window):
+            return None
+        # 겹치는 구간의 종가가 그대로인지 (수정주가 반영 등으로 바뀌지 않았는지) 확인합니다.
+        if not np.array_equal(close[b:old_end], old_close[a:], equal_nan=True):
+            return None
+
+        columns = entry["columns"]
+        added = log_returns(close[old_end - 1:])[:, columns]
+        if np.isnan(added).any():
+            return None
+        sums = entry["sums"] + added.sum(axis=0)
+        cross = entry["cross"] + added.T @ added
+        count = entry["count"] + num_new
+        window_close = close[window_start:]
+        if num_dropped:
+            # 구간 밖으로 밀려난 가장 오래된 수익률을 뺍니다.
+            dropped = log_returns(old_close[:num_dropped + 1])[:, columns]
+            sums -= dropped.sum(axis=0)
+            cross -= dropped.T @ dropped
+            count -= num_dropped
+            # 빠진 구간 때문에 새로 포함될 수 있는 종목이 생겼으면 처음부터 다시 계산합니다.
+            excluded = np.setdiff1d(np.arange(close.shape[1]), columns)
+            if len(excluded) and (~np.isnan(log_returns(window_close)[:, excluded]).any(axis=0)).any():
+                return None
+        return self._entry(index[window_start:], window_close, columns, count, sums, cross,
+                           updates=entry["updates"] + num_new + num_dropped)
+
+    def _entry(self, index, window_close, columns, count, sums, cross, updates):
+        """index는 window_close에 해당하는 날짜 (구간에 쓰인 종가 행만 보관합니다)."""
+        correlation = correlation_from_sums(count, sums, cross) if count >= 2 else np.full(cross.shape, np.nan)
+        window_close = np.array(window_close)
+        nbytes = window_close.nbytes + cross.nbytes + correlation.nbytes
+        return {"index": index, "close": window_close, "columns": columns, "count": count, "sums": sums,
+                "cross": cross, "correlation": correlation, "updates": updates, "nbytes": nbytes}
+
+    def _evict(self):
+        # 방금 넣은 항목 하나는 한도를 넘더라도 남겨 둡니다.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self._total_bytes -= old["nbytes"]
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_correlation_cache():
+    """서버 프로세스 전체에서 공유하는 상관행렬 캐시."""
+    return CorrelationCache()
@@ -0,0 +1,118 @@
+"""
+긴 주가 기록을 그래프로 보내기 전에 서버에서 줄이는 다운샘플링 도구.
+
+모든 함수는 (날짜 x 티커) 값 행렬을 받아 티커마다 남길 행 번호 행렬 (점 수 x 티커)을 돌려줍니다.
+반복은 구간(bucket) 수만큼만 돌고, 각 단계는 모든 티커에 대해 한 번에 계산합니다.
+"""
+import numpy as np
+import pandas as pd
+
+DOWNSAMPLING_METHODS = {
+    "lttb": "LTTB (모양 보존)",
+    "minmax": "구간별 최소/최대 (극값 보존)",
+    "none": "원본 (모든 점)",
+}
+
+
+def _bucket_edges(num_rows, num_buckets, first=0):
+    """[first, num_rows) 구간을 num_buckets개로 거의 같은 크기로 나눈 경계."""
+    return np.linspace(first, num_rows, num_buckets + 1).astype(np.int64)
+
+
+def _nan_mean(values, axis=0):
+    """빈 구간 경고 없이 NaN을 무시한 평균 (모두 NaN이면 NaN)."""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=axis)
+    sums = np.where(valid, values, 0).sum(axis=axis)
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+
+def lttb_indices(x, values, num_points):
+    """
+    Largest-Triangle-Three-Buckets. 첫 점과 마지막 점은 항상 남기고, 가운데 구간마다
+    직전에 고른 점과 다음 구간 평균점으로 만든 삼각형의 넓이가 가장 큰 점을 고릅니다.
+    NaN(상장 전 등)은 고르지 않으며, 구간 전체가 NaN이면 그 구간의 첫 점(NaN)이 남아 그래프에 빈칸으로 보입니다.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    num_rows, num_series = values.shape
+    if num_points >= num_rows or num_points < 3:
+        return np.repeat(np.arange(num_rows)[:, None], num_series, axis=1)
+
+    columns = np.arange(num_series)
+    edges = _bucket_edges(num_rows - 1, num_points - 2, first=1)
+    selected = np.empty((num_points, num_series), dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = num_rows - 1
+    previous = selected[0]
+    for i in range(num_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 마지막 구간의 다음 '구간'은 마지막 점 하나입니다.
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (num_rows - 1, num_rows)
+        next_x = x[next_lo:next_hi].mean()
+        next_y = _nan_mean(values[next_lo:next_hi])
+
+        previous_x = x[previous]
+        previous_y = values[previous, columns]
+        bucket_x = x[lo:hi, None]
+        bucket_y = values[lo:hi]
+        area = np.abs((previous_x - next_x) * (bucket_y - previous_y) - (previous_x - bucket_x) * (next_y - previous_y))
+        # 기준점이 NaN이면 넓이를 비교할 수 없으므로 구간의 첫 유효한 점을 고릅니다.
+        area = np.where(np.isnan(area), 0.0, area)
+        area = np.where(np.isnan(bucket_y), -np.inf, area)
+        previous = lo + area.argmax(axis=0)
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(values, num_points):
+    """구간마다 최솟값과 최댓값 두 점을 남깁니다. (급등락 같은 극값이 사라지지 않음)"""
+    num_rows, num_series = values.shape
+    num_buckets = num_points // 2
+    if num_points >= num_rows or num_buckets < 1:
+        return np.repeat(np.arange(num_rows)[:, None], num_series, axis=1)
+
+    # lttb_indices와 같이 linspace 경계로 나누므로 모든 구간에 실제 행이 하나 이상 들어갑니다.
+    # 구간 크기는 최대 1만큼 다르므로, 가장 큰 구간에 맞춰 (구간 수, 구간 크기, 티커) 모양으로 모으고 남는 칸은 빈 칸으로 둡니다.
+    edges = _bucket_edges(num_rows, num_buckets)
+    starts = edges[:-1, None]
+    rows = starts + np.arange(np.diff(edges).max())
+    in_bucket = (rows < edges[1:, None])[:, :, None]
+    buckets = values[np.minimum(rows, num_rows - 1)]
+    # 구간 전체가 NaN이면 argmin/argmax가 구간의 첫 점을 고릅니다.
+    low = starts + np.where(in_bucket & ~np.isnan(buckets), buckets, np.inf).argmin(axis=1)
+    high = starts + np.where(in_bucket & ~np.isnan(buckets), buckets, -np.inf).argmax(axis=1)
+    selected = np.sort(np.concatenate([low, high]).reshape(2, num_buckets, num_series), axis=0)
+    return selected.transpose(1, 0, 2).reshape(num_buckets * 2, num_series)
+
+
+def downsample_indices(x, values, num_points, method="lttb"):
+    """method에 따라 티커별로 남길 행 번호 행렬 (점 수 x 티커)을 돌려줍니다."""
+    values = np.asarray(values, dtype=np.float64)
+    if method == "lttb":
+        return lttb_indices(x, values, num_points)
+    if method == "minmax":
+        return minmax_indices(values, num_points)
+    if method == "none":
+        return np.repeat(np.arange(values.shape[0])[:, None], values.shape[1], axis=1)
+    raise ValueError(f"지원하지 않는 다운샘플링 방법입니다: {method}")
+
+
+def downsampled_line_traces(frame, num_points, method="lttb", **kwargs):
+    """
+    (날짜 x 종목) DataFrame의 각 열을 num_points개 이하로 줄인 Plotly 선(Scattergl) trace 목록으로 만듭니다.
+    전송되는 데이터 크기는 원래 길이와 상관없이 종목 수 x num_points에 비례합니다.
+    """
+    import plotly.graph_objects as go # matplotlib만 쓰는 페이지가 plotly를 불러오지 않도록 여기서 임포트
+
+    values = frame.to_numpy(dtype=np.float64)
+    dates = frame.index.to_numpy()
+    # 날짜 간격이 고르지 않아도 모양이 유지되도록 실제 시각(일 단위)을 x로 사용합니다.
+    if isinstance(frame.index, pd.DatetimeIndex):
+        x = frame.index.asi8 / 86_400e9
+    else:
+        x = np.arange(len(frame), dtype=np.float64)
+    selected = downsample_indices(x, values, num_points, method=method)
+    return [
+        go.Scattergl(x=dates[selected[:, j]], y=values[selected[:, j], j], mode="lines", name=str(name), **kwargs)
+        for j, name in enumerate(frame.columns)
+    ]
@@ -0,0 +1,78 @@
+"""
+룰렛 페이지들(main.py, 룰렛1, 룰렛2)이 함께 쓰는 추첨 상태.
+
+남은 번호는 '맨 뒤와 바꿔서 지우는' 배열에, 뽑혔는지 여부는 번호별 플래그 배열에 보관합니다.
+그래서 무작위 추첨, 특정 번호 제거, 뽑혔는지 확인은 인원수와 상관없이 O(1)이고,
+정렬된 남은 번호 목록은 화면에 보여줄 때만 한 번에 만듭니다.
+"""
+import random
+
+import numpy as np
+
+
+class DrawState:
+    """1번부터 total번까지의 번호 중 아직 뽑히지 않은 번호를 관리합니다."""
+
+    def __init__(self, total):
+        self.total = int(total)
+        # 남은 번호는 _pool[:_size]에 순서 없이 들어 있고, _position[번호]는 그 번호의 _pool 위치입니다.
+        self._pool = np.arange(1, self.total + 1, dtype=np.int64)
+        self._position = np.arange(-1, self.total, dtype=np.int64) # 0번 자리는 쓰지 않습니다.
+        self._size = self.total
+        self._drawn_flags = np.zeros(self.total + 1, dtype=bool) # 번호별 '뽑힘' 플래그
+        self.history = [] # 뽑힌 순서
+
+    def __len__(self):
+        """남은 번호 개수."""
+        return self._size
+
+    def __contains__(self, number):
+        """number가 아직 뽑히지 않은 번호인지 여부."""
+        return 1 <= number <= self.total and not self._drawn_flags[number]
+
+    def is_drawn(self, number):
+        return bool(self._drawn_flags[number])
+
+    @property
+    def drawn_count(self):
+        return len(self.history)
+
+    def sample(self, rng=random):
+        """남은 번호 중 하나를 무작위로 고릅니다. (제거하지 않음, 남은 번호가 없으면 None)"""
+        if self._size == 0:
+            return None
+        return int(self._pool[rng.randrange(self._size)])
+
+    def remove(self, number):
+        """number를 뽑힌 번호로 기록합니다. 맨 뒤의 번호를 그 자리로 옮기므로 O(1)입니다."""
+        if number not in self:
+            raise ValueError(f"{number}번은 남은 번호가 아닙니다.")
+        index, last = self._position[number], self._pool[self._size - 1]
+        self._pool[index], self._position[last] = last, index
+        self._pool[self._size - 1] = number
+        self._position[number] = self._size - 1
+        self._size -= 1
+        self._drawn_flags[number] = True
+        self.history.append(int(number))
+
+    def draw(self, rng=random):
+        """남은 번호 중 하나를 무작위로 뽑아 기록하고 돌려줍니다. (남은 번호가 없으면 None)"""
+        number = self.sample(rng)
+        if number is not None:
+            self.remove(number)
+        return number
+
+    def remaining_sorted(self, include=()):
+        """
+        남은 번호를 오름차순 리스트로 돌려줍니다. include에 있는 번호(방금 뽑힌 번호 등)도 함께 넣을 수 있습니다.
+        O(전체 인원)이므로 프레임마다가 아니라 화면에 목록을 보여줄 때만 호출합니다.
+        """
+        remaining = ~self._drawn_flags
+        remaining[0] = False
+        for number in include:
+            remaining[number] = True
+        return (np.flatnonzero(remaining)).tolist()
+
+    def fixed_slots(self):
+        """1번부터 total번까지 고정된 칸 배열. 뽑힌 번호의 칸은 0(빈 칸)입니다. (wheel_render용)"""
+        return np.where(self._drawn_flags[1:], 0, np.arange(1, self.total + 1))
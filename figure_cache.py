@@ -0,0 +1,95 @@
+"""matplotlib 그래프를 입력 값별로 한 번만 그려 이미지 바이트로 보관하는 캐시."""
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import streamlit as st
+
+# 캐시 전체가 사용할 수 있는 최대 메모리 (바이트). 넘으면 가장 오래 사용하지 않은 그림부터 지웁니다.
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# pyplot은 스레드 안전하지 않으므로 여러 세션이 동시에 그림을 그리지 않도록 잠급니다.
+_render_lock = threading.RLock()
+
+
+def render_figure(fig, fmt="png", dpi=200):
+    """그림을 이미지 바이트로 저장하고 바로 닫습니다."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+class FigureCache:
+    """그래프 입력 값(키)별로 렌더링된 이미지 바이트를 보관하는 LRU 캐시."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, draw, fmt="png", dpi=200):
+        """key에 해당하는 이미지가 없으면 draw()로 Figure를 만들어 렌더링한 뒤 저장합니다."""
+        full_key = (key, fmt, dpi)
+        with self._lock:
+            image = self._entries.get(full_key)
+            if image is not None:
+                self._entries.move_to_end(full_key)
+                return image
+
+        with _render_lock:
+            image = render_figure(draw(), fmt=fmt, dpi=dpi)
+
+        with self._lock:
+            if full_key not in self._entries:
+                self._entries[full_key] = image
+                self._total_bytes += len(image)
+                self._evict()
+        return image
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self._total_bytes -= len(old)
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """서버 프로세스 전체에서 하나만 존재하는 그래프 캐시."""
+    return FigureCache()
+
+
+def show_cached_figure(key, draw, fmt="png", dpi=200):
+    """
+    key(그래프의 입력 값 튜플)로 캐시된 이미지를 st.image로 보여줍니다.
+    캐시에 없을 때만 draw()를 호출하며, 만들어진 Figure는 렌더링 후 바로 닫힙니다.
+    """
+    image = get_figure_cache().get_or_render(key, draw, fmt=fmt, dpi=dpi)
+    if fmt == "svg":
+        st.image(image.decode("utf-8"), use_container_width=True)
+    else:
+        st.image(image, use_container_width=True)
+
+
+def show_figure(draw):
+    """
+    캐시하지 않는 그래프를 st.pyplot으로 보여준 뒤 Figure를 닫습니다.
+    draw()는 Figure를 만들어 돌려주는 함수이며, 그림을 만드는 과정 전체가 잠금 안에서 실행됩니다.
+    """
+    with _render_lock:
+        fig = draw()
+        try:
+            st.pyplot(fig)
+        finally:
+            plt.close(fig)
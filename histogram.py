@@ -0,0 +1,21 @@
+"""히스토그램을 서버에서 미리 구간(bin)별로 집계하여 그래프에는 구간 배열만 넘기기 위한 도구."""
+import numpy as np
+
+
+def compute_histogram(data, bins, density=False, range=None):
+    """NumPy로 (구간별 값, 구간 경계) 배열을 계산합니다. 값은 density=True이면 밀도, 아니면 빈도입니다."""
+    counts, edges = np.histogram(data, bins=bins, density=density, range=range)
+    counts.flags.writeable = False
+    edges.flags.writeable = False
+    return counts, edges
+
+
+def plot_histogram(ax, counts, edges, **kwargs):
+    """미리 집계한 히스토그램을 matplotlib 축에 막대로 그립니다. (ax.hist와 같은 모양)"""
+    return ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **kwargs)
+
+
+def histogram_bar(counts, edges, **kwargs):
+    """미리 집계한 히스토그램을 Plotly 막대(Bar) trace로 만듭니다. 전송되는 데이터 크기는 구간 수에만 비례합니다."""
+    import plotly.graph_objects as go # matplotlib만 쓰는 페이지가 plotly를 불러오지 않도록 여기서 임포트
+    return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), **kwargs)
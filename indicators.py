@@ -0,0 +1,271 @@
+"""
+종가 행렬에 대한 기술적 지표 계산 (이동평균, 지수이동평균, 변동성, 낙폭, 누적 수익률).
+
+모든 지표는 (날짜 x 티커) 행렬에 대한 배열 연산으로 한 번에 계산합니다.
+이동평균, 지수이동평균, 변동성은 그날까지의 기록만으로 정해지므로 IndicatorCache가 티커별로
+시작일이 고정된 기록 위에서 보관하고, 새 봉이 붙으면 마지막 상태(지수이동평균)와 최근 구간만으로 새 봉만 계산해 이어 붙입니다.
+돌려주는 값은 항상 표시 구간만으로 처음부터 계산한 값과 같습니다.
+낙폭, 최대 낙폭, 누적 수익률은 표시 구간의 시작일을 기준으로 하므로 구간을 잘라낸 뒤 누적 연산으로 바로 계산합니다.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+TRADING_DAYS_PER_YEAR = 252
+
+# 캐시 전체가 사용할 수 있는 최대 메모리 (바이트). 넘으면 가장 오래 사용하지 않은 티커부터 지웁니다.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 지표 이름 -> 표시 이름
+INDICATORS = {
+    "sma": "이동평균",
+    "ewma": "지수이동평균",
+    "volatility": "변동성 (연율화)",
+    "drawdown": "고점 대비 하락률",
+    "max_drawdown": "최대 낙폭",
+    "cumulative_return": "누적 수익률",
+}
+
+# 시작일이 고정된 기록 위에서 이어 계산하는 지표와, 표시 구간마다 새로 계산하는 지표
+ROLLING_INDICATORS = ("sma", "ewma", "volatility")
+WINDOW_INDICATORS = ("drawdown", "max_drawdown", "cumulative_return")
+
+# 새 봉을 이어 계산할 때 필요한 티커별 마지막 상태
+_STATE_NAMES = ("ewma",)
+
+
+def _first_valid(values):
+    """열마다 첫 번째 NaN이 아닌 값 (없으면 NaN)."""
+    valid = ~np.isnan(values)
+    rows = valid.argmax(axis=0)
+    first = values[rows, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), first, np.nan)
+
+
+def advance_indicators(history, num_new, state, sma_window=20, ewma_span=20, volatility_window=20):
+    """
+    history의 마지막 num_new개 행(새 봉)에 대한 이동평균, 지수이동평균, 변동성을 계산합니다.
+    history는 새 봉 앞에 이동 구간 계산에 필요한 만큼(volatility_window개 이상)의 이전 종가를 붙인 (행 x 티커) 배열이고,
+    state는 이전 봉까지의 마지막 상태 {"ewma"} (티커별 배열, 처음이면 NaN)입니다.
+    처음부터 계산할 때는 전체 종가와 num_new=전체 행 수, NaN 상태를 넘기면 됩니다.
+    ({지표 이름: (num_new x 티커) 배열}, 새 상태)를 돌려줍니다.
+    """
+    history = np.asarray(history, dtype=np.float64)
+    new = history[-num_new:]
+
+    # 이동평균과 변동성: 이전 종가를 포함한 구간에서 pandas의 이동 구간 연산으로 계산한 뒤 새 봉 부분만 씁니다.
+    frame = pd.DataFrame(history)
+    sma = frame.rolling(sma_window).mean().to_numpy()[-num_new:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.log(frame / frame.shift(1))
+    volatility = (log_returns.rolling(volatility_window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)).to_numpy()[-num_new:]
+
+    # 지수이동평균: e = a x + (1 - a) e_prev. NaN인 날은 직전 값을 유지합니다.
+    alpha = 2 / (ewma_span + 1)
+    ewma = np.empty_like(new)
+    previous = state["ewma"]
+    for i, row in enumerate(new):
+        previous = np.where(np.isnan(row), previous, np.where(np.isnan(previous), row, alpha * row + (1 - alpha) * previous))
+        ewma[i] = previous
+
+    values = {"sma": sma, "ewma": ewma, "volatility": volatility}
+    return values, {"ewma": ewma[-1]}
+
+
+def window_indicators(close):
+    """
+    표시 구간 (행 x 티커) 종가에 대한 고점 대비 하락률, 최대 낙폭, 누적 수익률.
+    모두 구간 시작일(티커의 첫 종가)부터 누적하므로 구간이 바뀌면 이어 계산할 수 없고, 누적 연산 몇 번으로 다시 계산합니다.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    running_max = np.fmax.accumulate(close, axis=0) # NaN은 건너뛰고 이전 고점을 유지합니다.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = close / running_max - 1
+        cumulative_return = close / _first_valid(close) - 1
+    max_drawdown = np.fmin.accumulate(drawdown, axis=0)
+    return {"drawdown": drawdown, "max_drawdown": max_drawdown, "cumulative_return": cumulative_return}
+
+
+def rebase_to_window(values, close, previous_ewma, sma_window=20, ewma_span=20, volatility_window=20):
+    """
+    시작일이 더 이른 기록에서 잘라낸 이동 구간 지표 values를, 표시 구간 close만으로 처음부터 계산한 값으로 바꿉니다.
+    그래서 캐시된 기록이 언제부터 시작했는지(어느 세션이 먼저 채웠는지)와 상관없이 결과가 같습니다.
+
+    이동평균과 변동성은 구간 앞부분(이동 구간이 다 차지 않은 행)만 NaN으로 바꾸면 되고,
+    지수이동평균은 시작값의 차이가 유효한 봉마다 (1 - a)배로 줄어드는 선형 점화식이므로 그 차이를 한 번에 빼 줍니다.
+    previous_ewma는 기록에서 표시 구간 바로 앞 행의 지수이동평균 (티커별 배열, 앞 행이 없으면 NaN)입니다.
+    """
+    values["sma"][:sma_window - 1] = np.nan
+    values["volatility"][:volatility_window] = np.nan
+
+    valid = ~np.isnan(close)
+    has_valid = valid.any(axis=0)
+    first = valid.argmax(axis=0) # 티커별 첫 유효 행
+    columns = np.arange(close.shape[1])
+    first_close = close[first, columns]
+    decay = 1 - 2 / (ewma_span + 1)
+    # 처음부터 계산하면 첫 유효 행의 값은 그날 종가이고, 기록에서 이어 계산한 값과의 차이는 (1 - a)(이전 값 - 종가)입니다.
+    difference = np.nan_to_num(decay * (previous_ewma - first_close))
+    steps = np.maximum(np.cumsum(valid, axis=0) - 1, 0)
+    ewma = values["ewma"] - difference * decay ** steps
+    ewma[np.arange(len(close))[:, None] < np.where(has_valid, first, len(close))] = np.nan
+    values["ewma"] = ewma
+    return values
+
+
+class IndicatorCache:
+    """
+    (이름 공간, 티커)별로 이동 구간 지표 배열과 마지막 상태를 보관하는 LRU 캐시.
+    이름 공간에는 데이터 소스와 정렬 설정처럼 같은 티커라도 종가가 달라지는 조건을 넣습니다.
+
+    캐시된 기록은 처음 계산한 날의 구간 시작일에 고정되어 있습니다. 날이 바뀌어 표시 구간의 시작일이 뒤로 밀려도
+    새 구간이 캐시된 기록 안에서 시작하고 겹치는 종가가 같으면, 뒤에 붙은 새 봉만 계산하고 표시 구간만 잘라 돌려줍니다.
+    잘라낸 값은 rebase_to_window로 표시 구간만으로 처음부터 계산한 값과 같게 맞추므로, 결과는 캐시 상태와 상관없습니다.
+    이름 공간에 기간 길이를 넣으면 길이가 다른 화면끼리 서로의 기록을 지우며 다시 계산하지 않습니다.
+    """
+
+    def __init__(self, sma_window=20, ewma_span=20, volatility_window=20, max_bytes=DEFAULT_MAX_BYTES):
+        self.params = {"sma_window": sma_window, "ewma_span": ewma_span, "volatility_window": volatility_window}
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # (이름 공간, 티커) -> {"index", "close", "values", "state"}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _history_rows(self):
+        # 새 봉의 이동 구간 지표를 계산하려면 그 앞에 이만큼의 이전 종가가 필요합니다.
+        return max(self.params["sma_window"], self.params["volatility_window"] + 1)
+
+    def get(self, namespace, close_prices):
+        """
+        close_prices (날짜 x 티커)의 지표를 {지표 이름: DataFrame}으로 돌려줍니다.
+        캐시된 기록 뒤에 새 봉만 붙었으면 (구간 시작일이 밀린 경우 포함) 새 봉만 계산하고,
+        그 밖의 경우(구간이 앞으로 늘었거나 과거 값이 바뀐 경우)는 다시 계산합니다.
+        """
+        index = close_prices.index
+        values = close_prices.to_numpy(dtype=np.float64)
+        num_rows = len(index)
+
+        with self._lock:
+            # 계산 방법이 같은 티커끼리 묶습니다: (구간 시작 위치, 겹치는 행 수) -> 열 번호 목록 (None이면 처음부터 계산)
+            groups = defaultdict(list)
+            index_matches = {} # 같은 날짜 인덱스를 공유하는 티커끼리는 인덱스 비교를 한 번만 합니다.
+            for column, ticker in enumerate(close_prices.columns):
+                groups[self._match(namespace, ticker, index, values[:, column], index_matches)].append(column)
+
+            offsets = {}
+            for match, columns in groups.items():
+                tickers = close_prices.columns[columns]
+                if match is None:
+                    state = {name: np.full(len(columns), np.nan) for name in _STATE_NAMES}
+                    new_values, new_state = advance_indicators(values[:, columns], num_rows, state, **self.params)
+                    for i, ticker in enumerate(tickers):
+                        self._store(namespace, ticker, index, values[:, columns[i]], None,
+                                    {name: array[:, i] for name, array in new_values.items()},
+                                    {name: array[i] for name, array in new_state.items()})
+                        offsets[ticker] = 0
+                    continue
+                offset, overlap = match
+                for ticker in tickers:
+                    offsets[ticker] = offset
+                if overlap == num_rows:
+                    continue
+                # 캐시된 기록의 마지막 부분과 새 봉을 이어 붙여 새 봉의 지표만 계산합니다.
+                entries = [self._entries[(namespace, ticker)] for ticker in tickers]
+                state = {name: np.array([entry["state"][name] for entry in entries]) for name in _STATE_NAMES}
+                new_close = values[overlap:, columns]
+                previous = np.stack([entry["close"][-self._history_rows():] for entry in entries]).T
+                new_values, new_state = advance_indicators(np.vstack([previous, new_close]), len(new_close),
+                                                           state, **self.params)
+                for i, ticker in enumerate(tickers):
+                    self._store(namespace, ticker, index[overlap:], new_close[:, i], entries[i],
+                                {name: array[:, i] for name, array in new_values.items()},
+                                {name: array[i] for name, array in new_state.items()})
+
+            entries = [self._entries[(namespace, ticker)] for ticker in close_prices.columns]
+            for ticker in close_prices.columns:
+                self._entries.move_to_end((namespace, ticker))
+            # 시작일이 고정된 기록에서 표시 구간만 잘라 (티커 x 날짜)로 쌓은 뒤 전치하면 열 우선 배열이 되어
+            # DataFrame이 다시 복사하지 않습니다. 잘라낸 값은 아래에서 표시 구간만으로 계산한 값으로 맞춥니다.
+            rolling = {name: np.stack([entry["values"][name][offsets[ticker]:offsets[ticker] + num_rows]
+                                       for ticker, entry in zip(close_prices.columns, entries)]).T
+                       for name in ROLLING_INDICATORS}
+            previous_ewma = np.array([entry["values"]["ewma"][offsets[ticker] - 1] if offsets[ticker] else np.nan
+                                      for ticker, entry in zip(close_prices.columns, entries)])
+            self._evict(keep=len(entries))
+        rolling = rebase_to_window(rolling, values, previous_ewma, **self.params)
+        rolling.update(window_indicators(values))
+        return {name: pd.DataFrame(array, index=index, columns=close_prices.columns, copy=False)
+                for name, array in rolling.items()}
+
+    def _match(self, namespace, ticker, index, close, index_matches):
+        """
+        이번 구간이 캐시된 기록의 offset번째 행에서 시작하고 overlap개 행이 겹치면 (offset, overlap)을,
+        이어 계산할 수 없으면 None을 돌려줍니다.
+        """
+        entry = self._entries.get((namespace, ticker))
+        if entry is None or len(index) == 0:
+            return None
+        cached_index = entry["index"]
+        key = id(cached_index)
+        if key not in index_matches:
+            index_matches[key] = self._match_index(cached_index, index)
+        match = index_matches[key]
+        if match is None:
+            return None
+        # 겹치는 구간의 종가가 수정된 경우(수정주가 반영 등)에는 처음부터 다시 계산합니다.
+        offset, overlap = match
+        if not np.array_equal(close[:overlap], entry["close"][offset:offset + overlap], equal_nan=True):
+            return None
+        return match
+
+    def _match_index(self, cached_index, index):
+        if cached_index is index:
+            return 0, len(index)
+        offset = cached_index.searchsorted(index[0])
+        # 구간이 기록보다 앞에서 시작하거나, 기록이 표시 구간보다 너무 길어졌으면 (메모리) 처음부터 다시 계산합니다.
+        if offset >= len(cached_index) or cached_index[offset] != index[0] or offset > len(index):
+            return None
+        overlap = min(len(cached_index) - offset, len(index))
+        if not index[:overlap].equals(cached_index[offset:offset + overlap]):
+            return None
+        # 표시 구간이 기록의 끝보다 먼저 끝나면 (새 봉이 없으면) 기록 안에서 잘라 쓰기만 합니다.
+        return offset, overlap
+
+    def _store(self, namespace, ticker, index, close, old, new_values, new_state):
+        """old가 있으면 그 기록 뒤에 새 봉(index, close, new_values)을 이어 붙이고, 없으면 새로 저장합니다."""
+        key = (namespace, ticker)
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._total_bytes -= previous["nbytes"]
+        if old is not None:
+            index = old["index"].append(index)
+            close = np.concatenate([old["close"], close])
+            new_values = {name: np.concatenate([old["values"][name], array]) for name, array in new_values.items()}
+        else: # 행렬의 열 뷰 대신 연속된 복사본을 보관합니다.
+            close = np.array(close)
+            new_values = {name: np.ascontiguousarray(array) for name, array in new_values.items()}
+        nbytes = close.nbytes + sum(array.nbytes for array in new_values.values())
+        self._entries[key] = {"index": index, "close": close, "values": new_values, "state": new_state, "nbytes": nbytes}
+        self._total_bytes += nbytes
+
+    def _evict(self, keep=1):
+        # 방금 요청한 티커들(keep개)은 한도를 넘더라도 남겨 둡니다.
+        while self._total_bytes > self.max_bytes and len(self._entries) > keep:
+            _, old = self._entries.popitem(last=False)
+            self._total_bytes -= old["nbytes"]
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_indicator_cache(sma_window=20, ewma_span=20, volatility_window=20):
+    """서버 프로세스 전체에서 공유하는 지표 캐시. (지표 구간 설정별로 하나씩)"""
+    return IndicatorCache(sma_window=sma_window, ewma_span=ewma_span, volatility_window=volatility_window)
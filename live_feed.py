@@ -0,0 +1,188 @@
+"""
+주식 페이지의 실시간 모드가 사용하는 시세 공급원(tick source), 링 버퍼, 공유 라이브 보드.
+
+LiveBoard 하나가 백그라운드 스레드에서 시세를 받아 티커별 고정 크기 링 버퍼에 봉(bar)으로 쌓고,
+같은 보드를 보는 모든 세션은 버퍼의 스냅샷만 읽습니다. 그래서 보는 사람이 늘어도 시세 요청은 한 번입니다.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+BAR_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class TickSource:
+    """
+    시세 공급원의 공통 인터페이스.
+    poll(now)는 마지막 호출 이후의 체결을 (티커 목록, 시각(초) 배열, 가격 배열, 거래량 배열)로 돌려줍니다.
+    """
+
+    name = "base"
+
+    def poll(self, now):
+        raise NotImplementedError
+
+
+class SimulatedTickSource(TickSource):
+    """
+    네트워크 없이 테스트할 수 있는 모의 시세. 호출할 때마다 모든 티커에 체결 하나씩을 만들며,
+    가격은 start_prices에서 시작하는 기하 브라운 운동을 따릅니다.
+    """
+
+    name = "simulated"
+
+    def __init__(self, tickers, start_prices, seed=0, annual_volatility=0.3):
+        self.tickers = list(tickers)
+        self.prices = np.asarray(start_prices, dtype=np.float64).copy()
+        self.rng = np.random.default_rng(seed)
+        # 움직임이 눈에 보이도록 체결 한 번을 하루 치 변동으로 취급합니다.
+        self.tick_volatility = annual_volatility / np.sqrt(252)
+
+    def poll(self, now):
+        shocks = self.rng.normal(0.0, self.tick_volatility, len(self.tickers))
+        self.prices = self.prices * np.exp(shocks - 0.5 * self.tick_volatility**2)
+        volumes = np.round(1e4 * np.exp(0.5 * self.rng.normal(size=len(self.tickers))))
+        return self.tickers, np.full(len(self.tickers), now), self.prices.copy(), volumes
+
+
+TICK_SOURCES = {
+    "simulated": "모의 시세 (오프라인)",
+}
+
+
+def make_tick_source(name, tickers, start_prices, seed=0):
+    """이름으로 시세 공급원을 만듭니다."""
+    if name == "simulated":
+        return SimulatedTickSource(tickers, start_prices, seed=seed)
+    raise ValueError(f"지원하지 않는 시세 공급원입니다: {name}")
+
+
+class RingBuffer:
+    """
+    최근 capacity개의 봉만 보관하는 고정 크기 버퍼. 가득 차면 가장 오래된 봉을 덮어씁니다.
+    메모리는 처음에 한 번만 할당하며, 마지막 봉은 같은 시간 구간의 체결이 들어오면 제자리에서 갱신됩니다.
+    """
+
+    def __init__(self, capacity, fields=BAR_FIELDS):
+        self.capacity = capacity
+        self.fields = list(fields)
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(self.fields)), np.nan)
+        self._next = 0 # 다음에 쓸 위치
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def last_time(self):
+        return self.times[(self._next - 1) % self.capacity] if self._size else None
+
+    def append(self, bar_time, values):
+        self.times[self._next] = bar_time
+        self.values[self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def last(self):
+        return self.values[(self._next - 1) % self.capacity]
+
+    def snapshot(self):
+        """(시각 배열, 값 배열)을 오래된 봉부터 순서대로 복사해서 돌려줍니다."""
+        if self._size < self.capacity:
+            return self.times[:self._size].copy(), self.values[:self._size].copy()
+        order = np.r_[self._next:self.capacity, 0:self._next]
+        return self.times[order], self.values[order]
+
+
+class LiveBoard:
+    """
+    여러 세션이 함께 보는 실시간 시세 보드.
+    백그라운드 스레드가 poll_seconds마다 시세를 받아 bar_seconds 단위 봉으로 모으며,
+    idle_seconds 동안 아무도 읽지 않으면 스레드를 멈추고 다음에 읽을 때 다시 시작합니다.
+    """
+
+    def __init__(self, source, bar_seconds=5, capacity=720, poll_seconds=1.0, idle_seconds=60.0):
+        self.source = source
+        self.bar_seconds = bar_seconds
+        self.poll_seconds = poll_seconds
+        self.idle_seconds = idle_seconds
+        self.buffers = {}
+        self.capacity = capacity
+        self.version = 0 # 새 체결이 반영될 때마다 1씩 늘어납니다.
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_access = time.monotonic()
+        self._figures = {} # (버전, 그래프 키) -> 그래프. 같은 버전은 한 번만 그립니다.
+
+    def _ingest(self, tickers, times, prices, volumes):
+        with self._lock:
+            for ticker, tick_time, price, volume in zip(tickers, times, prices, volumes):
+                buffer = self.buffers.get(ticker)
+                if buffer is None:
+                    buffer = self.buffers[ticker] = RingBuffer(self.capacity)
+                bar_time = tick_time // self.bar_seconds * self.bar_seconds
+                if buffer.last_time == bar_time:
+                    bar = buffer.last() # 같은 봉 안의 체결이면 고가, 저가, 종가, 거래량만 갱신
+                    bar[1] = max(bar[1], price)
+                    bar[2] = min(bar[2], price)
+                    bar[3] = price
+                    bar[4] += volume
+                else:
+                    buffer.append(bar_time, (price, price, price, price, volume))
+            self.version += 1
+            self._figures = {key: figure for key, figure in self._figures.items() if key[0] == self.version}
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if time.monotonic() - self._last_access > self.idle_seconds:
+                    self._thread = None
+                    return
+            self._ingest(*self.source.poll(time.time()))
+            time.sleep(self.poll_seconds)
+
+    def touch(self):
+        """보드를 읽는 쪽에서 호출합니다. 수집 스레드가 멈춰 있으면 다시 시작합니다."""
+        with self._lock:
+            self._last_access = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-board", daemon=True)
+                self._thread.start()
+
+    def frame(self, tickers, field="Close"):
+        """tickers의 field 값을 (시각 x 티커) DataFrame으로 돌려줍니다."""
+        column = BAR_FIELDS.index(field)
+        with self._lock:
+            series = {}
+            for ticker in tickers:
+                if ticker in self.buffers:
+                    times, values = self.buffers[ticker].snapshot()
+                    series[ticker] = pd.Series(values[:, column], index=pd.to_datetime(times, unit="s"))
+        return pd.DataFrame(series)
+
+    def figure(self, key, draw):
+        """
+        현재 버전의 그래프를 key별로 한 번만 그립니다. draw(board)는 그래프를 만드는 함수입니다.
+        같은 보드를 보는 세션들은 새 체결이 들어오기 전까지 같은 그래프 객체를 다시 씁니다.
+        """
+        with self._lock:
+            full_key = (self.version, key)
+            figure = self._figures.get(full_key)
+        if figure is None:
+            figure = draw(self)
+            with self._lock:
+                self._figures[full_key] = figure
+        return figure
+
+
+@st.cache_resource
+def get_live_board(source_name, tickers, _start_prices, bar_seconds=5):
+    """
+    (시세 공급원, 종목 구성, 봉 길이)별로 서버 전체에서 하나만 존재하는 라이브 보드.
+    시작 가격(_start_prices)은 보드를 처음 만들 때만 쓰이므로 캐시 키에서 제외합니다. (밑줄로 시작하는 인자)
+    """
+    return LiveBoard(make_tick_source(source_name, tickers, _start_prices), bar_seconds=bar_seconds)
@@ -0,0 +1,353 @@
+"""
+주가 데이터 제공자(provider) 모음.
+
+모든 제공자는 fetch(tickers, start, end)로 yf.download(group_by='ticker')와 같은 모양,
+즉 (티커, 필드) 멀티인덱스 컬럼과 날짜 인덱스를 가진 DataFrame을 돌려줍니다.
+제공자 객체는 호출 가능하므로 PriceCache, ParquetPriceStore의 fetch 인자로 그대로 넘길 수 있습니다.
+인터넷 제공자는 FetchScheduler로 감싸 티커별로 동시에, 재시도와 시간 제한을 두고 받아올 수 있습니다.
+"""
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MarketDataProvider:
+    """주가 데이터 제공자의 공통 인터페이스."""
+
+    name = "base"
+    # 이미 로컬에 있는 데이터인지 여부. 로컬 제공자는 디스크 저장소를 거치지 않아도 됩니다.
+    is_local = False
+    # fetch가 여러 티커를 한 번의 요청으로 받아오는지 여부. FetchScheduler가 티커가 많을 때 먼저 이 요청을 씁니다.
+    batch_fetch = False
+
+    def fetch(self, tickers, start, end):
+        raise NotImplementedError
+
+    def fetch_one(self, ticker, start, end, timeout=None):
+        """티커 하나의 OHLCV를 단일 레벨 컬럼 DataFrame으로 돌려줍니다. (없으면 빈 DataFrame)"""
+        data = self.fetch([ticker], start, end)
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0):
+                return pd.DataFrame()
+            data = data[ticker]
+        return data.dropna(how="all")
+
+    def __call__(self, tickers, start, end):
+        return self.fetch(list(tickers), start, end)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """yfinance에서 주가를 받아오는 제공자. 티커가 많으면 batch_size개씩 나눠서 요청합니다."""
+
+    name = "yfinance"
+    batch_fetch = True
+
+    # yf.download는 내부 전역 상태를 공유하므로 여러 세션이 동시에 묶음 요청을 보내지 않도록 합니다.
+    _download_lock = threading.Lock()
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+
+    def fetch(self, tickers, start, end):
+        import yfinance as yf # 오프라인 제공자만 쓸 때는 yfinance를 불러오지 않습니다.
+
+        frames = []
+        for i in range(0, len(tickers), self.batch_size):
+            batch = tickers[i:i + self.batch_size]
+            with self._download_lock:
+                data = yf.download(batch, start=start, end=end, group_by='ticker', progress=False)
+            if not data.empty:
+                frames.append(data)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1) if len(frames) > 1 else frames[0]
+
+    def fetch_one(self, ticker, start, end, timeout=10):
+        # yf.download는 내부 전역 상태를 공유해 여러 스레드에서 동시에 부르면 결과가 섞일 수 있으므로
+        # 티커별 요청은 Ticker.history를 사용합니다. (yf.download 기본값과 같은 수정주가, OHLCV만)
+        import yfinance as yf
+
+        data = yf.Ticker(ticker).history(start=start, end=end, auto_adjust=True, actions=False,
+                                         timeout=timeout, raise_errors=True)
+        if data.empty:
+            return data
+        if data.index.tz is not None: # yf.download처럼 시간대 없는 날짜로 맞춥니다.
+            data.index = data.index.tz_localize(None)
+        data.index.name = "Date"
+        return data[[field for field in OHLCV_FIELDS if field in data.columns]]
+
+
+class LocalFileProvider(MarketDataProvider):
+    """
+    폴더 안의 티커별 파일({티커}.parquet 또는 {티커}.csv)에서 주가를 읽는 제공자.
+    파일은 날짜 인덱스(CSV는 첫 번째 컬럼)와 OHLCV 컬럼을 가져야 합니다.
+    """
+
+    name = "local"
+    is_local = True
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read(self, ticker):
+        parquet_path = os.path.join(self.directory, f"{ticker}.parquet")
+        if os.path.exists(parquet_path):
+            return pd.read_parquet(parquet_path)
+        csv_path = os.path.join(self.directory, f"{ticker}.csv")
+        if os.path.exists(csv_path):
+            return pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        return None
+
+    def fetch(self, tickers, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        frames = {}
+        for ticker in tickers:
+            frame = self._read(ticker)
+            if frame is None:
+                continue
+            frame = frame.loc[(frame.index >= start) & (frame.index < end)]
+            if not frame.empty:
+                frames[ticker] = frame
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+
+def _splitmix64(x):
+    """uint64 배열에 대한 splitmix64 해시. 같은 입력이면 항상 같은 난수 비트를 만듭니다."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    네트워크 없이 결정론적인 합성 주가를 만드는 제공자 (부하 테스트와 벤치마크용).
+    (시드, 티커, 날짜)의 해시로 난수를 만들기 때문에 요청한 종목 구성이나 기간과 상관없이
+    같은 티커의 같은 날짜에는 항상 같은 값이 나오며, 모든 티커와 날짜를 배열 연산 한 번에 계산합니다.
+
+    경로는 BLOCK_DAYS 거래일 단위 블록으로 나뉩니다. 블록마다 전체 수익률(블록 합)을 먼저 해시로 정하고,
+    블록 안의 일별 수익률은 그 합에 맞춘 브라운 다리(Brownian bridge)로 만듭니다.
+    그래서 요청 구간이 짧으면 ORIGIN부터 모든 날을 계산하지 않고, 블록 합의 누적과 구간이 걸친 블록만 계산합니다.
+    """
+
+    name = "synthetic"
+    is_local = True
+
+    # 모든 합성 주가는 이 날짜부터 시작하는 하나의 경로에서 잘라낸 값입니다.
+    ORIGIN = pd.Timestamp("1990-01-01")
+    # 블록 길이 (거래일). 약 1년
+    BLOCK_DAYS = 256
+
+    def __init__(self, seed=0, annual_drift=0.08, annual_volatility=0.3):
+        self.seed = seed
+        self.daily_drift = annual_drift / 252
+        self.daily_volatility = annual_volatility / np.sqrt(252)
+
+    def _ticker_keys(self, tickers):
+        keys = [zlib.crc32(ticker.encode("utf-8")) ^ (self.seed << 32) for ticker in tickers]
+        return np.array(keys, dtype=np.uint64)
+
+    def _standard_normals(self, day_index, ticker_keys, stream):
+        """(날짜 수, 티커 수) 표준정규 난수 행렬 (Box-Muller). stream(0~7)마다 서로 다른 난수열입니다."""
+        base = _splitmix64(ticker_keys[None, :] ^ _splitmix64(day_index[:, None] * np.uint64(8) + np.uint64(stream)))
+        u1 = ((base >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0**53
+        u2 = ((_splitmix64(base) >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0**53
+        return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+    def fetch(self, tickers, start, end):
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if not tickers or end <= max(start, self.ORIGIN):
+            return pd.DataFrame()
+
+        # ORIGIN부터 센 거래일 번호로 [first_day, last_day) 구간을 계산합니다.
+        origin = self.ORIGIN.date()
+        first_day = int(np.busday_count(origin, max(start, self.ORIGIN).date()))
+        last_day = int(np.busday_count(origin, end.date()))
+        if last_day <= first_day:
+            return pd.DataFrame()
+        keys = self._ticker_keys(tickers)
+        block_days = self.BLOCK_DAYS
+        first_block, last_block = first_day // block_days, (last_day - 1) // block_days
+
+        # 블록 합: 처음 블록부터 마지막 블록까지 (블록 수 x 티커) 개만 만들면 되므로 기간이 길어도 가볍습니다.
+        # 시작 가격은 티커마다 20~500 사이에서 정해집니다.
+        start_prices = 20 + 480 * ((_splitmix64(keys) >> np.uint64(11)).astype(np.float64) / 2.0**53)
+        mean_return = self.daily_drift - 0.5 * self.daily_volatility**2
+        block_index = np.arange(last_block + 1, dtype=np.uint64)
+        block_totals = (mean_return * block_days
+                        + self.daily_volatility * np.sqrt(block_days) * self._standard_normals(block_index, keys, 4))
+        block_starts = np.log(start_prices)[None, :] + np.vstack([np.zeros((1, len(tickers))),
+                                                                  np.cumsum(block_totals[:-1], axis=0)])
+
+        # 구간이 걸친 블록의 일별 수익률: 표준정규 난수에서 블록 평균을 빼고 블록 합을 고르게 나눠 더합니다. (브라운 다리)
+        blocks = np.arange(first_block, last_block + 1)
+        day_index = (blocks[:, None] * block_days + np.arange(block_days)).astype(np.uint64)
+        normals = self._standard_normals(day_index.ravel(), keys, 0).reshape(len(blocks), block_days, len(tickers))
+        log_returns = (self.daily_volatility * (normals - normals.mean(axis=1, keepdims=True))
+                       + block_totals[blocks][:, None, :] / block_days)
+        log_levels = np.concatenate([block_starts[blocks][:, None, :],
+                                     block_starts[blocks][:, None, :] + np.cumsum(log_returns, axis=1)], axis=1)
+        close = np.exp(log_levels[:, 1:]).reshape(-1, len(tickers))
+        previous_close = np.exp(log_levels[:, :-1]).reshape(-1, len(tickers))
+
+        visible = slice(first_day - first_block * block_days, last_day - first_block * block_days)
+        close, previous_close = close[visible], previous_close[visible]
+        visible_index = np.arange(first_day, last_day, dtype=np.uint64)
+        days = pd.DatetimeIndex(np.busday_offset(origin, np.arange(first_day, last_day)), name="Date")
+
+        gap = 0.002 * self._standard_normals(visible_index, keys, 1)
+        open_ = previous_close * np.exp(gap)
+        wick = 0.01 * np.abs(self._standard_normals(visible_index, keys, 2))
+        high = np.maximum(open_, close) * (1 + wick)
+        low = np.minimum(open_, close) * (1 - wick)
+        volume = np.round(1e6 * np.exp(0.5 * self._standard_normals(visible_index, keys, 3)))
+
+        # (날짜, 티커, 필드) 배열을 한 번에 (티커, 필드) 멀티인덱스 컬럼으로 바꿉니다.
+        values = np.stack([open_, high, low, close, volume], axis=2).reshape(len(days), -1)
+        columns = pd.MultiIndex.from_product([tickers, OHLCV_FIELDS])
+        return pd.DataFrame(values, index=days, columns=columns)
+
+
+class FetchScheduler:
+    """
+    티커를 하나씩 나눠 제한된 크기의 스레드 풀에서 동시에 받아오는 스케줄러.
+    티커마다 지수 백오프로 재시도하고, timeout초 안에 끝나지 않으면 기다리지 않고 '시간 초과'로 처리하므로
+    느리거나 실패하는 종목 하나가 전체 다운로드를 붙잡지 않습니다.
+    묶음 요청을 지원하는 제공자(yfinance)는 처음 불러오기처럼 티커가 많으면 먼저 한 번에 받아오고, 빠진 티커만 하나씩 받아옵니다.
+    티커별 마지막 결과는 statuses()로 확인할 수 있습니다.
+    """
+
+    def __init__(self, max_workers=8, timeout=30.0, retries=2, backoff=0.5, batch_min_tickers=8):
+        self.timeout = timeout
+        # 묶음 요청을 지원하는 제공자는 티커가 이만큼 이상이면 먼저 한 번에 받아오고, 빠진 티커만 하나씩 받아옵니다.
+        self.batch_min_tickers = batch_min_tickers
+        self.retries = retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-fetch")
+        # (제공자 이름, 티커) -> {"status": ok|no_data|error|timeout, "attempts", "error", "elapsed"}
+        # no_data는 오류 없이 요청 구간에 새 봉이 없었다는 뜻으로 실패가 아닙니다.
+        self._statuses = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, provider, tickers, start, end):
+        """
+        provider로 tickers를 티커별로 동시에 받아 (티커, 필드) 멀티인덱스 DataFrame으로 합칩니다.
+        실패하거나 시간 초과된 티커는 결과에서 빠지고, 그 이유는 statuses()에 남습니다.
+        """
+        frames, remaining = {}, list(tickers)
+        if provider.batch_fetch and len(tickers) >= self.batch_min_tickers:
+            frames, remaining = self._fetch_batch(provider, tickers, start, end)
+
+        started = {} # 티커 -> 작업을 시작한 시각 (대기열에 있는 동안은 시간 제한을 재지 않습니다)
+        futures = {self._executor.submit(self._fetch_with_retry, provider, ticker, start, end, started): ticker
+                   for ticker in remaining}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = futures[future]
+                frame, status = future.result()
+                if frame is not None:
+                    frames[ticker] = frame
+                self._set_status(provider, ticker, status)
+            now = time.monotonic()
+            for future in list(pending):
+                ticker = futures[future]
+                if ticker in started and now - started[ticker] > self.timeout:
+                    # 실행 중인 스레드는 멈출 수 없으므로 결과만 버립니다. (네트워크 요청 자체에도 timeout이 있습니다)
+                    pending.discard(future)
+                    future.cancel()
+                    self._set_status(provider, ticker, {"status": "timeout", "attempts": None,
+                                                        "error": f"{self.timeout:g}초 안에 받아오지 못했습니다.",
+                                                        "elapsed": now - started[ticker]})
+        if not frames:
+            return pd.DataFrame()
+        # 요청한 티커 순서를 유지합니다.
+        return pd.concat({ticker: frames[ticker] for ticker in tickers if ticker in frames}, axis=1)
+
+    def _fetch_batch(self, provider, tickers, start, end):
+        """
+        처음 불러오기처럼 티커가 많을 때 provider.fetch 한 번으로 받아옵니다.
+        (받아온 {티커: DataFrame}, 하나씩 다시 받아와야 할 티커 목록)을 돌려줍니다.
+        묶음 요청이 실패하거나 시간 안에 끝나지 않으면 모든 티커를, 일부만 빠졌으면 빠진 티커만 다시 받아옵니다.
+        yf.download는 티커별 오류를 예외 없이 빈 결과로 돌려주므로, 빠진 티커가 새 봉이 없는 것인지 실패인지는
+        티커별 요청으로 가립니다.
+        """
+        begin = time.monotonic()
+        future = self._executor.submit(provider.fetch, list(tickers), start, end)
+        try:
+            data = future.result(timeout=self.timeout)
+        except Exception: # 시간 초과를 포함한 모든 오류는 티커별 요청으로 다시 시도합니다.
+            return {}, list(tickers)
+        elapsed = time.monotonic() - begin
+        frames = {}
+        received = set(data.columns.get_level_values(0)) if not data.empty else set()
+        for ticker in tickers:
+            frame = data[ticker].dropna(how="all") if ticker in received else None
+            if frame is not None and not frame.empty:
+                frames[ticker] = frame
+                self._set_status(provider, ticker, {"status": "ok", "attempts": 1, "error": None, "elapsed": elapsed})
+        return frames, [ticker for ticker in tickers if ticker not in frames]
+
+    def _fetch_with_retry(self, provider, ticker, start, end, started):
+        started[ticker] = begin = time.monotonic()
+        error = None
+        for attempt in range(1, self.retries + 2):
+            try:
+                frame = provider.fetch_one(ticker, start, end, timeout=self.timeout)
+            except Exception as e: # 네트워크, 파싱 오류 등은 모두 재시도 대상입니다.
+                error = f"{type(e).__name__}: {e}"
+            else:
+                # 오류 없이 빈 결과가 오면 그 구간에 새 봉이 없는 것(휴장일, 주말, 장 시작 전)이므로 재시도하지 않습니다.
+                if frame is None or frame.empty:
+                    frame, status = None, "no_data"
+                else:
+                    status = "ok"
+                return frame, {"status": status, "attempts": attempt, "error": None,
+                               "elapsed": time.monotonic() - begin}
+            if attempt > self.retries:
+                break
+            # 지수 백오프 (0.5초, 1초, 2초, ...)에 지터를 더해 여러 티커가 동시에 다시 요청하지 않도록 합니다.
+            delay = self.backoff * 2 ** (attempt - 1) * (1 + random.random() / 2)
+            if time.monotonic() - begin + delay > self.timeout:
+                break
+            time.sleep(delay)
+        return None, {"status": "error", "attempts": attempt, "error": error, "elapsed": time.monotonic() - begin}
+
+    def _set_status(self, provider, ticker, status):
+        with self._lock:
+            self._statuses[(provider.name, ticker)] = status
+
+    def statuses(self, provider, tickers):
+        """tickers 중 이 제공자로 받아온 적이 있는 티커의 마지막 결과 {티커: 상태}."""
+        with self._lock:
+            return {ticker: self._statuses[(provider.name, ticker)]
+                    for ticker in tickers if (provider.name, ticker) in self._statuses}
+
+
+PROVIDERS = {
+    "yfinance": "yfinance (인터넷)",
+    "local": "로컬 파일 폴더 (CSV/Parquet)",
+    "synthetic": "합성 데이터 (오프라인 재생)",
+}
+
+
+def make_provider(name, directory=None, seed=0):
+    """이름으로 제공자를 만듭니다."""
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "local":
+        return LocalFileProvider(directory)
+    if name == "synthetic":
+        return SyntheticProvider(seed=seed)
+    raise ValueError(f"지원하지 않는 데이터 제공자입니다: {name}")
@@ -1,22 +1,21 @@
 import streamlit as st
-import yfinance as yf
+import os
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go # Import plotly.graph_objects
-import statsmodels.api as sm # Import statsmodels for OLS
-from datetime import datetime, timedelta
+from stock_data import (ALIGNMENT_POLICIES, DEFAULT_STORE_DIR, extract_close_prices, get_fetch_scheduler,
+                        get_price_cache, get_price_store, normalize_prices, trading_day_window)
+from market_data import PROVIDERS, make_provider
+from downsample import DOWNSAMPLING_METHODS, downsampled_line_traces
+from trend import linear_trends, rolling_trends
+from indicators import get_indicator_cache
+from correlation import cluster_order, get_correlation_cache
+from live_feed import TICK_SOURCES, get_live_board
 
 # Streamlit 페이지 설정: 전체 너비 사용
 st.set_page_config(layout="wide")
 
-# 앱의 제목과 설명
-st.title("글로벌 시가총액 상위 기업 최근 3년간 주가 변화")
-st.markdown("""
-이 앱은 `yfinance` 라이브러리를 사용하여 글로벌 시가총액 상위 기업들의 최근 3년간 주가 변화를 시각화합니다.
-**주의:** 아래 기업 리스트는 예시이며, 실시간 시가총액 상위 10개 기업과는 다를 수 있습니다.
-앱 실행 전에 정확한 최신 티커 리스트로 업데이트하는 것을 권장합니다.
-""")
-
 # 글로벌 시가총액 상위권에 있을 가능성이 높은 기업들 (예시)
 # 실제 사용 시에는 이 리스트를 최신 정보로 업데이트해야 합니다.
 # 한국 기업을 추가하려면 "005930.KS" (삼성전자) 와 같이 ".KS"를 붙여야 합니다.
@@ -35,69 +34,163 @@ TICKERS = {
     # "005930.KS": "Samsung Electronics Co., Ltd.", # 예시: 삼성전자
 }
 
+# --- 사이드바: 데이터 소스 설정 ---
+# 인터넷 없이도 페이지를 실행하고 부하를 측정할 수 있도록 로컬 파일, 합성 데이터 제공자를 선택할 수 있습니다.
+st.sidebar.header("데이터 설정")
+data_source = st.sidebar.selectbox("데이터 소스", list(PROVIDERS), format_func=PROVIDERS.get)
+local_data_dir = None
+if data_source == "local":
+    local_data_dir = st.sidebar.text_input("주가 파일 폴더", value="data/prices", help="{티커}.csv 또는 {티커}.parquet 파일이 들어 있는 폴더")
+elif data_source == "synthetic":
+    num_synthetic_tickers = st.sidebar.number_input("종목 수", min_value=len(TICKERS), max_value=2000, value=len(TICKERS), step=10)
+    # 예시 기업 뒤에 합성 종목을 덧붙여 원하는 크기의 종목 구성을 만듭니다.
+    TICKERS = {**TICKERS, **{f"SYN{i:04d}": f"합성 종목 {i:04d}" for i in range(1, num_synthetic_tickers - len(TICKERS) + 1)}}
+history_years = st.sidebar.slider("기간 (년)", min_value=1, max_value=20, value=3)
+# 종목마다 데이터 시작일이 다를 때의 처리 방식과, 중간에 빠진 날짜를 직전 종가로 채울 최대 일수
+alignment = st.sidebar.selectbox("날짜 정렬", list(ALIGNMENT_POLICIES), format_func=ALIGNMENT_POLICIES.get)
+ffill_limit = st.sidebar.number_input("결측 채우기 최대 일수", min_value=0, max_value=30, value=5,
+                                      help="거래 정지 등으로 빠진 날짜를 직전 종가로 최대 며칠까지 채울지 정합니다.")
+
+# --- 사이드바: 그래프 설정 ---
+# 긴 기간이나 많은 종목을 그대로 보내면 그래프 데이터가 수 MB가 되므로, 서버에서 종목당 점 수를 줄여서 보냅니다.
+st.sidebar.header("그래프 설정")
+downsampling_method = st.sidebar.selectbox("다운샘플링 방식", list(DOWNSAMPLING_METHODS), format_func=DOWNSAMPLING_METHODS.get)
+points_per_trace = st.sidebar.slider("종목당 최대 점 수", min_value=100, max_value=5000, value=1000, step=100,
+                                     disabled=downsampling_method == "none")
+
+# --- 사이드바: 지표 설정 ---
+st.sidebar.header("지표 설정")
+sma_window = st.sidebar.number_input("이동평균 구간 (거래일)", min_value=2, max_value=250, value=20)
+ewma_span = st.sidebar.number_input("지수이동평균 span", min_value=2, max_value=250, value=20)
+volatility_window = st.sidebar.number_input("변동성 구간 (거래일)", min_value=2, max_value=250, value=20)
+
+# --- 사이드바: 실시간 모드 ---
+# 실시간 시세는 서버 전체에서 하나의 보드가 받아서 모으고, 각 화면은 일정 간격으로 실시간 그래프 부분만 다시 그립니다.
+st.sidebar.header("실시간 모드")
+live_mode = st.sidebar.checkbox("실시간 시세 보기", value=False)
+if live_mode:
+    tick_source = st.sidebar.selectbox("시세 공급원", list(TICK_SOURCES), format_func=TICK_SOURCES.get)
+    live_refresh_seconds = st.sidebar.slider("화면 갱신 간격 (초)", min_value=1, max_value=10, value=2)
+    live_bar_seconds = st.sidebar.selectbox("봉 길이 (초)", [1, 5, 15, 60], index=1)
+
+# 앱의 제목과 설명
+st.title(f"글로벌 시가총액 상위 기업 최근 {history_years}년간 주가 변화")
+st.markdown(f"""
+이 앱은 `yfinance` 라이브러리를 사용하여 글로벌 시가총액 상위 기업들의 최근 {history_years}년간 주가 변화를 시각화합니다.
+**주의:** 아래 기업 리스트는 예시이며, 실시간 시가총액 상위 10개 기업과는 다를 수 있습니다.
+앱 실행 전에 정확한 최신 티커 리스트로 업데이트하는 것을 권장합니다.
+""")
+
 # yfinance에 전달할 티커 목록 (딕셔너리의 키 값들)
 yf_tickers = list(TICKERS.keys())
 
-# 최근 3년 데이터 가져오기 위한 날짜 설정
-end_date = datetime.now()
-start_date = end_date - timedelta(days=3 * 365) # 대략 3년 전
+# 최근 데이터 가져오기 위한 날짜 설정
+# 거래일 경계로 맞춰서, 같은 거래일 안에서는 재실행해도 구간이 바뀌지 않도록 합니다.
+start_date, end_date = trading_day_window(years=history_years)
+
+# 캐시된 주가를 '신선한' 것으로 보는 시간 (초). 지나면 캐시를 먼저 보여주고 백그라운드에서 새로 받아옵니다.
+PRICE_CACHE_TTL_SECONDS = 60 * 60
+
+# 주가 데이터 제공자 (yfinance / 로컬 파일 / 합성 데이터)
+provider = make_provider(data_source, directory=local_data_dir)
 
-# yfinance를 사용하여 주가 데이터를 가져오는 함수
-# @st.cache_data 데코레이터를 사용하여 데이터를 캐싱하여 앱 성능 향상
-@st.cache_data
+# 인터넷 제공자는 티커가 많으면 한 번에 묶어 받고, 빠진 티커는 티커별로 동시에 받아옵니다. (동시 요청 수 제한, 티커별 시간 제한과 재시도)
+fetch_scheduler = get_fetch_scheduler()
+
+# 주가 데이터를 가져오는 함수
+# 서버 전체에서 공유하는 주가 캐시를 사용하여 앱 성능 향상 (오래된 데이터는 먼저 보여주고 뒤에서 갱신)
+# 인터넷 제공자는 디스크 저장소(티커별 Parquet)에서 읽고, 저장소에 없는 날짜 구간만 받아와 이어 붙입니다.
 def get_stock_data(tickers, start, end):
-    """
-    주어진 티커 리스트에 대해 yfinance에서 주가 데이터를 다운로드합니다.
-    """
-    # yfinance.download는 멀티인덱스 DataFrame을 반환합니다.
-    # group_by='ticker'를 사용하면 각 티커별로 데이터가 그룹화됩니다.
-    data = yf.download(tickers, start=start, end=end, group_by='ticker')
-    return data
+    fetch = provider
+    if not provider.is_local:
+        price_store = get_price_store(os.path.join(DEFAULT_STORE_DIR, provider.name))
+        def fetch(tickers, start, end):
+            return price_store.load(tickers, start, end, lambda *args: fetch_scheduler.fetch(provider, *args))
+    # 기간 길이별로 캐시하므로 거래일이 바뀌어도 이전 구간을 먼저 보여주고 새 구간은 백그라운드에서 받아옵니다.
+    return get_price_cache(PRICE_CACHE_TTL_SECONDS).get(tickers, start, end, fetch, source=(data_source, local_data_dir),
+                                                        years=history_years)
 
 # 주가 데이터 가져오기
-stock_data = get_stock_data(yf_tickers, start_date, end_date)
+stock_data, is_stale = get_stock_data(yf_tickers, start_date, end_date)
+if is_stale:
+    st.caption("⏳ 캐시된 주가를 먼저 보여주고 있습니다. 최신 데이터는 백그라운드에서 받아오는 중입니다.")
+
+# 티커별 다운로드 결과 중 실패한 것만 한 번에 요약해서 보여줍니다.
+# 새 봉이 없는 구간(휴장일, 주말, 장 시작 전)을 받은 경우(no_data)는 실패가 아니므로 빼고 보여줍니다.
+FETCH_STATUS_LABELS = {"error": "오류", "timeout": "시간 초과"}
+failed_fetches = {ticker: status for ticker, status in fetch_scheduler.statuses(provider, yf_tickers).items()
+                  if status["status"] in FETCH_STATUS_LABELS}
+if failed_fetches:
+    with st.expander(f"⚠️ {len(failed_fetches)}개 티커의 데이터를 받아오지 못했습니다. 나머지 종목으로 표시합니다."):
+        st.dataframe(pd.DataFrame([
+            {"티커": ticker, "기업": TICKERS[ticker], "결과": FETCH_STATUS_LABELS[status["status"]],
+             "시도 횟수": status["attempts"], "소요 시간 (초)": round(status["elapsed"], 1), "오류": status["error"]}
+            for ticker, status in failed_fetches.items()
+        ]), hide_index=True)
 
 # 데이터가 성공적으로 로드되었는지 확인
 if not stock_data.empty:
-    # 각 기업의 'Close' (종가) 가격만 추출하여 하나의 DataFrame으로 결합
-    close_prices = pd.DataFrame()
-    for ticker in yf_tickers:
-        # yfinance 다운로드 결과는 멀티인덱스 컬럼을 가질 수 있습니다.
-        # 각 티커의 'Close' 가격을 올바르게 참조합니다.
-        if (ticker, 'Close') in stock_data.columns:
-            close_prices[ticker] = stock_data[(ticker, 'Close')]
-        elif ticker in stock_data.columns: # 단일 티커 요청 시 컬럼이 단일 레벨일 수 있음
-             close_prices[ticker] = stock_data[ticker]['Close']
-        else:
-            st.warning(f"티커 '{ticker}'의 데이터를 가져오지 못했습니다. 올바른 티커인지 확인해주세요.")
+    # 각 기업의 'Close' (종가) 가격만 멀티인덱스 교차 구간으로 한 번에 추출 (float32)
+    # 종목별 시작일은 그대로 두고, 중간에 빠진 날짜만 최대 ffill_limit일까지 직전 종가로 채웁니다.
+    close_prices = extract_close_prices(stock_data, yf_tickers, ffill_limit=ffill_limit, alignment=alignment)
 
-    if not close_prices.empty:
-        # 결측치 제거 (주말, 공휴일 등으로 데이터가 없는 경우)
-        close_prices = close_prices.dropna()
+    # 다운로드 실패는 위에서 이미 알렸으므로 그 밖에 데이터가 없는 티커만 알려줍니다.
+    missing_tickers = [ticker for ticker in yf_tickers if ticker not in close_prices.columns and ticker not in failed_fetches]
+    if missing_tickers:
+        st.warning(f"다음 티커의 데이터가 없습니다. 올바른 티커인지 확인해주세요: {', '.join(missing_tickers)}")
 
+    if not close_prices.empty:
         # close_prices DataFrame의 컬럼 이름을 전체 기업명으로 변경
         # 이렇게 하면 그래프의 범례와 호버 텍스트에 전체 기업명이 표시됩니다.
         close_prices.rename(columns=TICKERS, inplace=True)
 
         # 주가 변화율 계산 (첫 번째 날짜의 가격을 100으로 정규화)
         # 이를 통해 각 기업의 상대적인 성과를 비교하기 용이합니다.
-        # .iloc[0]은 DataFrame의 첫 번째 행(즉, 첫 번째 날짜의 가격)을 가져옵니다.
-        normalized_prices = close_prices / close_prices.iloc[0] * 100
+        # 늦게 상장한 종목은 자신의 첫 거래일 가격을 기준으로 합니다.
+        normalized_prices = normalize_prices(close_prices)
 
-        # --- 정규화된 주가 변화 시각화 ---
-        st.subheader("최근 3년간 주가 변화 (정규화된 값, 시작일=100)")
-        # Plotly Express를 사용하여 대화형 라인 차트 생성
-        fig_normalized = px.line(
-            normalized_prices,
-            x=normalized_prices.index, # x축: 날짜
-            y=normalized_prices.columns, # y축: 각 기업의 전체 기업명
-            title="글로벌 시가총액 상위 기업 최근 3년간 주가 변화 (시작일 기준 100)",
-            labels={"value": "주가 (시작일 기준 100)", "index": "날짜", "variable": "기업"},
-            hover_name="variable" # 마우스 오버 시 기업 이름 표시
-        )
-        # 마우스 오버 시 모든 라인 정보 표시
-        fig_normalized.update_layout(
+        # --- 추세선 ---
+        # 모든 종목의 추세선(기울기, 절편, R², 추세선 값)을 한 번에 계산해 주가 데이터와 함께 보관합니다.
+        # 주가 데이터나 정렬 설정이 바뀔 때만 다시 계산하므로, 기업을 바꿔 선택하면 계산 없이 꺼내 씁니다.
+        analytics_key = (data_source, local_data_dir, ffill_limit, alignment, history_years)
+        if ('price_analytics' not in st.session_state
+                or st.session_state.price_analytics["key"] != analytics_key
+                or st.session_state.price_analytics["prices"] is not stock_data):
+            st.session_state.price_analytics = {
+                "key": analytics_key,
+                "prices": stock_data,
+                "trends": linear_trends(close_prices.to_numpy()),
+                "rolling_trends": {}, # 구간 길이 -> 이동 추세
+                "indicators": {}, # (이동평균 구간, span, 변동성 구간) -> {지표 이름: DataFrame}
+            }
+        price_analytics = st.session_state.price_analytics
+
+        # --- 기술적 지표 ---
+        # 서버 전체에서 공유하는 지표 캐시는 티커별 결과를 보관하고, 새 봉이 붙으면 그 부분만 계산해 이어 붙입니다.
+        indicator_params = (sma_window, ewma_span, volatility_window)
+        if indicator_params not in price_analytics["indicators"]:
+            price_analytics["indicators"][indicator_params] = get_indicator_cache(*indicator_params).get(analytics_key, close_prices)
+        indicators = price_analytics["indicators"][indicator_params]
+
+        # --- 확대 구간 ---
+        # 선택한 구간만 잘라서 다시 다운샘플링하므로, 구간을 좁힐수록 같은 점 수로 더 자세히 볼 수 있습니다.
+        first_date, last_date = close_prices.index[0].to_pydatetime(), close_prices.index[-1].to_pydatetime()
+        if first_date < last_date:
+            zoom_start, zoom_end = st.slider("표시 구간", min_value=first_date, max_value=last_date,
+                                             value=(first_date, last_date), format="YYYY-MM-DD")
+        else:
+            zoom_start, zoom_end = first_date, last_date
+        zoomed_close = close_prices.loc[zoom_start:zoom_end]
+        zoomed_normalized = normalized_prices.loc[zoom_start:zoom_end]
+        if downsampling_method != "none" and len(zoomed_close) > points_per_trace:
+            st.caption(f"그래프는 {len(zoomed_close):,}개 날짜를 종목당 최대 {points_per_trace:,}개 점으로 줄여서 보여줍니다. "
+                       "'표시 구간'을 좁히면 더 자세히 볼 수 있습니다.")
+
+        # 두 그래프에 공통으로 쓰는 레이아웃
+        line_chart_layout = dict(
             hovermode="x unified",
+            xaxis_title="날짜",
+            legend_title="기업",
             legend=dict(
                 orientation="v", # 범례를 수직으로 정렬
                 xanchor="left",  # x축 앵커를 왼쪽으로 설정
@@ -107,31 +200,107 @@ if not stock_data.empty:
             ),
             margin=dict(l=0, r=180, t=30, b=0) # 오른쪽 여백을 늘려 범례 공간 확보
         )
+
+        # --- 정규화된 주가 변화 시각화 ---
+        st.subheader(f"최근 {history_years}년간 주가 변화 (정규화된 값, 시작일=100)")
+        # 다운샘플링한 선(WebGL)으로 대화형 라인 차트 생성
+        fig_normalized = go.Figure(downsampled_line_traces(zoomed_normalized, points_per_trace, method=downsampling_method))
+        fig_normalized.update_layout(
+            title=f"글로벌 시가총액 상위 기업 최근 {history_years}년간 주가 변화 (시작일 기준 100)",
+            yaxis_title="주가 (시작일 기준 100)",
+            **line_chart_layout
+        )
         st.plotly_chart(fig_normalized, use_container_width=True)
 
         # --- 실제 주가 (종가) 시각화 ---
         st.subheader("실제 주가 (종가)")
-        fig_raw = px.line(
-            close_prices,
-            x=close_prices.index,
-            y=close_prices.columns,
-            title="글로벌 시가총액 상위 기업 실제 주가",
-            labels={"value": "종가", "index": "날짜", "variable": "기업"},
-            hover_name="variable"
-        )
+        fig_raw = go.Figure(downsampled_line_traces(zoomed_close, points_per_trace, method=downsampling_method))
         fig_raw.update_layout(
-            hovermode="x unified",
-            legend=dict(
-                orientation="v", # 범례를 수직으로 정렬
-                xanchor="left",  # x축 앵커를 왼쪽으로 설정
-                x=1.02,          # 차트 영역 바깥, 오른쪽에 위치 (여백 추가)
-                yanchor="top",   # y축 앵커를 위쪽으로 설정
-                y=1              # 차트 영역 상단에 위치
-            ),
-            margin=dict(l=0, r=180, t=30, b=0) # 오른쪽 여백을 늘려 범례 공간 확보
+            title="글로벌 시가총액 상위 기업 실제 주가",
+            yaxis_title="종가",
+            **line_chart_layout
         )
         st.plotly_chart(fig_raw, use_container_width=True)
 
+        # --- 실시간 시세 ---
+        if live_mode:
+            st.subheader("실시간 시세")
+            live_companies = st.multiselect("실시간으로 볼 기업", list(close_prices.columns),
+                                            default=list(close_prices.columns[:5]), max_selections=20)
+            # 보드는 (공급원, 종목 구성, 봉 길이)별로 하나이며, 모의 시세는 각 종목의 마지막 종가에서 시작합니다.
+            live_board = get_live_board(tick_source, tuple(close_prices.columns), close_prices.ffill().iloc[-1].to_numpy(),
+                                        bar_seconds=live_bar_seconds)
+
+            def draw_live_figure(board):
+                live_close = board.frame(live_companies)
+                # 실시간 모드를 켠 뒤 첫 봉 대비 변화율(%)
+                live_change = (live_close / live_close.bfill().iloc[0] - 1) * 100 if not live_close.empty else live_close
+                figure = go.Figure([go.Scatter(x=live_change.index, y=live_change[name], mode="lines", name=name)
+                                    for name in live_change.columns])
+                figure.update_layout(
+                    title=f"실시간 가격 변화 ({live_bar_seconds}초 봉, 시작 대비 %)",
+                    xaxis_title="시각", yaxis_title="변화율 (%)",
+                    hovermode="x unified", margin=dict(l=0, r=0, t=40, b=0),
+                )
+                return figure
+
+            # 이 부분만 live_refresh_seconds마다 다시 실행됩니다. 전체 기록과 다른 그래프는 다시 그리지 않습니다.
+            @st.fragment(run_every=live_refresh_seconds)
+            def show_live_board():
+                live_board.touch()
+                # 같은 보드를 보는 세션들은 새 체결이 들어오기 전까지 한 번 그린 그래프를 함께 씁니다.
+                st.plotly_chart(live_board.figure(tuple(live_companies), draw_live_figure),
+                                use_container_width=True, key="live_chart")
+                st.caption(f"보드 버전 {live_board.version} · {TICK_SOURCES[tick_source]}")
+
+            if live_companies:
+                show_live_board()
+
+        # --- 종목별 지표 요약 ---
+        st.subheader("종목별 지표 요약")
+        indicator_summary = pd.DataFrame({
+            "누적 수익률 (%)": indicators["cumulative_return"].iloc[-1] * 100,
+            f"변동성 ({volatility_window}일, 연율화 %)": indicators["volatility"].iloc[-1] * 100,
+            "고점 대비 (%)": indicators["drawdown"].iloc[-1] * 100,
+            "최대 낙폭 (%)": indicators["max_drawdown"].iloc[-1] * 100,
+        })
+        indicator_summary.index.name = "기업"
+        st.dataframe(indicator_summary.round(2), use_container_width=True)
+
+        # --- 수익률 상관관계 ---
+        st.subheader("종목 간 수익률 상관관계")
+        CORRELATION_WINDOWS = {60: "최근 60거래일", 120: "최근 120거래일", 250: "최근 250거래일", None: "전체 기간"}
+        correlation_window = st.selectbox("상관계수 구간", list(CORRELATION_WINDOWS), index=2, format_func=CORRELATION_WINDOWS.get)
+        use_clustering = st.checkbox("비슷하게 움직이는 종목끼리 모아서 정렬 (계층적 군집)", value=True)
+        # 로그 수익률 상관행렬은 (종목 구성, 구간)별로 서버 전체에서 공유하며, 새 봉이 붙으면 구간을 밀어 갱신합니다.
+        correlation, correlation_columns = get_correlation_cache().get(analytics_key, close_prices, window=correlation_window)
+        correlation_names = close_prices.columns[correlation_columns]
+        if len(correlation_columns) < len(close_prices.columns):
+            st.caption(f"구간 안에 빈 값이 있는 {len(close_prices.columns) - len(correlation_columns)}개 종목은 제외했습니다. (상장 전 기간 등)")
+        if len(correlation_columns) >= 2:
+            order = np.arange(len(correlation_columns))
+            if use_clustering:
+                try:
+                    order = cluster_order(correlation)
+                except ImportError:
+                    st.info("계층적 군집 정렬에는 scipy가 필요합니다. 원래 순서로 표시합니다.")
+            fig_correlation = go.Figure(go.Heatmap(
+                z=np.round(correlation[np.ix_(order, order)], 2),
+                x=correlation_names[order],
+                y=correlation_names[order],
+                colorscale="RdBu_r", zmin=-1, zmax=1,
+                colorbar=dict(title="상관계수"),
+            ))
+            fig_correlation.update_layout(
+                title=f"로그 수익률 상관계수 ({CORRELATION_WINDOWS[correlation_window]})",
+                height=max(500, min(1200, 12 * len(correlation_columns))),
+                yaxis=dict(autorange="reversed"),
+                margin=dict(l=0, r=0, t=40, b=0),
+            )
+            st.plotly_chart(fig_correlation, use_container_width=True)
+        else:
+            st.info("상관관계를 계산할 수 있는 종목이 두 개 이상 필요합니다.")
+
         # --- 개별 기업 주가 데이터 보기 ---
         st.subheader("개별 기업 주가 데이터 자세히 보기")
         # 사용자가 드롭다운 메뉴에서 기업을 선택하도록 허용 (전체 기업명 표시)
@@ -142,17 +311,17 @@ if not stock_data.empty:
             selected_ticker = next((ticker for ticker, name in TICKERS.items() if name == selected_company_name), None)
 
             if selected_ticker and selected_company_name in close_prices.columns:
-                st.write(f"**{selected_company_name} 주가 데이터 (최근 3년 종가):**")
+                st.write(f"**{selected_company_name} 주가 데이터 (최근 {history_years}년 종가):**")
                 
                 # 선택된 기업의 종가 Series를 DataFrame으로 변환
-                individual_df = pd.DataFrame(close_prices[selected_company_name]).reset_index()
+                # 종목별 시작일 이전의 빈 값은 제외합니다.
+                column = close_prices.columns.get_loc(selected_company_name)
+                valid_rows = close_prices[selected_company_name].notna().to_numpy()
+                individual_df = pd.DataFrame(close_prices[selected_company_name][valid_rows]).reset_index()
                 individual_df.columns = ['Date', 'Close']
                 # 'Date' 컬럼이 datetime 타입임을 명확히 합니다.
                 individual_df['Date'] = pd.to_datetime(individual_df['Date']) 
 
-                # 추세선 계산을 위해 날짜를 숫자로 변환한 새로운 컬럼을 추가합니다. (예: 0부터 시작하는 순차적인 인덱스)
-                individual_df['Numerical_Index'] = range(len(individual_df))
-
                 # plotly.express.line을 사용하여 개별 기업 차트 생성 (trendline 없이)
                 fig_individual = px.line(
                     individual_df,
@@ -162,32 +331,63 @@ if not stock_data.empty:
                     labels={"Close": "종가", "Date": "날짜"},
                 )
 
-                # OLS (Ordinary Least Squares) 회귀를 사용하여 추세선을 수동으로 추가
-                # x 값은 Numerical_Index를 사용하고 상수 항을 추가합니다.
-                X = sm.add_constant(individual_df['Numerical_Index'])
-                y = individual_df['Close']
-                
-                try:
-                    model = sm.OLS(y, X)
-                    results = model.fit()
-                    trend_line_values = results.predict(X)
+                # 추세선: 전체 기간 최소제곱 추세선, 또는 최근 N일로 적합한 이동 추세
+                trend_mode = st.radio("추세선", ["전체 기간", "이동 추세"], horizontal=True)
+                if trend_mode == "전체 기간":
+                    trends = price_analytics["trends"]
+                    trend_line_values = trends["fitted"][valid_rows, column]
+                    trend_name = '추세선 (OLS)'
+                    st.caption(f"기울기: 하루 {trends['slope'][column]:+.3f}, R²: {trends['r_squared'][column]:.3f}")
+                else:
+                    trend_window = st.number_input("이동 추세 구간 (거래일)", min_value=5, max_value=250, value=60, step=5)
+                    if trend_window not in price_analytics["rolling_trends"]:
+                        price_analytics["rolling_trends"][trend_window] = rolling_trends(close_prices.to_numpy(), trend_window)
+                    trends = price_analytics["rolling_trends"][trend_window]
+                    trend_line_values = trends["fitted"][valid_rows, column]
+                    trend_name = f'이동 추세 ({trend_window}일)'
+                    st.caption(f"최근 {trend_window}일 기울기: 하루 {trends['slope'][-1, column]:+.3f}, "
+                               f"R²: {trends['r_squared'][-1, column]:.3f}")
 
+                if pd.isna(trend_line_values).all():
+                    st.warning("추세선을 계산할 수 있을 만큼 데이터가 충분하지 않습니다.")
+                else:
                     # 추세선을 Plotly 그래프에 추가합니다.
                     fig_individual.add_trace(
                         go.Scatter(
                             x=individual_df['Date'], # 실제 날짜를 x축으로 사용
                             y=trend_line_values,
                             mode='lines',
-                            name='추세선 (OLS)',
+                            name=trend_name,
                             line=dict(color='red', dash='dash')
                         )
                     )
-                except Exception as e:
-                    st.warning(f"추세선 계산 중 오류가 발생했습니다: {e}. 데이터가 충분하지 않거나 변동성이 너무 클 수 있습니다.")
+
+                # 이동평균, 지수이동평균을 주가 위에 겹쳐 그립니다.
+                overlay_names = {"sma": f"이동평균 ({sma_window}일)", "ewma": f"지수이동평균 (span {ewma_span})"}
+                overlays = st.multiselect("함께 볼 지표", list(overlay_names), default=["sma"], format_func=overlay_names.get)
+                for name in overlays:
+                    fig_individual.add_trace(
+                        go.Scatter(
+                            x=individual_df['Date'],
+                            y=indicators[name][selected_company_name].to_numpy()[valid_rows],
+                            mode='lines',
+                            name=overlay_names[name],
+                        )
+                    )
 
                 fig_individual.update_layout(hovermode="x unified")
                 st.plotly_chart(fig_individual, use_container_width=True)
 
+                # 고점 대비 하락률과 변동성
+                risk_df = pd.DataFrame({
+                    "고점 대비 하락률 (%)": indicators["drawdown"][selected_company_name] * 100,
+                    f"변동성 ({volatility_window}일, 연율화 %)": indicators["volatility"][selected_company_name] * 100,
+                })[valid_rows]
+                fig_risk = px.line(risk_df, title=f"{selected_company_name} 낙폭과 변동성",
+                                   labels={"value": "%", "index": "날짜", "variable": "지표"})
+                fig_risk.update_layout(hovermode="x unified")
+                st.plotly_chart(fig_risk, use_container_width=True)
+
                 st.write(f"**{selected_company_name} 원본 데이터 (상위 5개 행):**")
                 st.dataframe(stock_data[selected_ticker].head())
             else:
@@ -1,7 +1,11 @@
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy import stats
+from stats_kernel import z_critical as lookup_z_critical
+from sampling import ENGINES, make_draw_batch, parallel_sample_stats, draw_sample, SampleStatsAccumulator
+from population_store import get_population, get_population_histogram
+from histogram import compute_histogram, plot_histogram
+from figure_cache import show_cached_figure, show_figure
 
 st.set_page_config(layout="wide")
 
@@ -15,13 +19,16 @@ st.sidebar.subheader("1. 모집단 설정")
 population_mean = st.sidebar.slider("모집단 평균 (μ)", min_value=50, max_value=150, value=100, step=1)
 population_std = st.sidebar.slider("모집단 표준편차 (σ)", min_value=5, max_value=30, value=15, step=1)
 population_size = 100000 # 가상의 모집단 크기 (충분히 크게 설정)
+population_seed = 42 # 모집단 생성 시드 (같은 설정이면 모든 세션이 같은 모집단을 공유)
 
 st.sidebar.markdown(f"**현재 모집단:** 정규분포 $N(\\mu={population_mean}, \\sigma={population_std})$")
 
 # 2. 표본 추출 설정
 st.sidebar.subheader("2. 표본 추출 설정")
-sample_size = st.sidebar.slider("표본 크기 (n)", min_value=5, max_value=100, value=30, step=5)
-num_samples = st.sidebar.slider("표본 추출 횟수", min_value=100, max_value=5000, value=1000, step=100)
+engine = st.sidebar.selectbox("표본 추출 엔진", list(ENGINES), format_func=ENGINES.get, help="'해석적 분포'는 표본 평균과 표본 분산을 이론적인 분포에서 바로 뽑으므로 표본 크기가 커도 빠릅니다.")
+sample_size = st.sidebar.slider("표본 크기 (n)", min_value=5, max_value=10000 if engine == "analytic" else 100, value=30, step=5)
+use_parallel = st.sidebar.checkbox("병렬 계산 사용 (대규모 실험)", False, help="여러 CPU 코어에서 표본을 나눠 추출합니다. 추출 횟수를 최대 1,000,000번까지 늘릴 수 있습니다.")
+num_samples = st.sidebar.slider("표본 추출 횟수", min_value=100, max_value=1000000 if use_parallel else 5000, value=1000, step=100)
 
 st.markdown(f"""
 안녕하세요! 이 활동지에서는 **모평균 추정의 원리**를 시각적으로 학습할 수 있습니다.
@@ -34,43 +41,73 @@ st.markdown(f"""
 """)
 st.markdown("---")
 
-# 모집단 데이터 생성 (시각화용)
-population_data = np.random.normal(population_mean, population_std, population_size)
+# 모집단 데이터 (시각화용). 서버 전체에서 공유되는 읽기 전용 배열입니다.
+population_data = get_population("normal", population_mean, population_std, population_size, population_seed)
 
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("모집단 분포")
-    fig_pop, ax_pop = plt.subplots(figsize=(8, 5))
-    ax_pop.hist(population_data, bins=50, density=True, alpha=0.6, color='skyblue', edgecolor='black')
-    ax_pop.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={population_mean})')
-    ax_pop.set_title("모집단 분포 (가상)")
-    ax_pop.set_xlabel("값")
-    ax_pop.set_ylabel("밀도")
-    ax_pop.legend()
-    st.pyplot(fig_pop)
+    def draw_population_figure():
+        fig_pop, ax_pop = plt.subplots(figsize=(8, 5))
+        # 모집단과 함께 캐시된 히스토그램 구간 값만 그립니다. (모집단 크기와 무관한 그리기 비용)
+        pop_counts, pop_edges = get_population_histogram("normal", population_mean, population_std, population_size, population_seed, bins=50)
+        plot_histogram(ax_pop, pop_counts, pop_edges, alpha=0.6, color='skyblue', edgecolor='black')
+        ax_pop.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={population_mean})')
+        ax_pop.set_title("모집단 분포 (가상)")
+        ax_pop.set_xlabel("값")
+        ax_pop.set_ylabel("밀도")
+        ax_pop.legend()
+        return fig_pop
+
+    # 입력 값이 같으면 이미 렌더링된 이미지를 그대로 사용합니다.
+    show_cached_figure(("01_population", population_mean, population_std, population_size, population_seed), draw_population_figure)
     st.markdown("""
     위 그래프는 우리가 알 수 없는 **모집단의 분포**를 가상으로 보여줍니다.
     우리의 목표는 이 모집단의 평균(빨간색 점선)을 **모르더라도** 표본을 통해 추정하는 것입니다.
     """)
 
-# 표본 추출 및 표본 평균 계산
-sample_means = []
-for _ in range(num_samples):
-    sample = np.random.choice(population_data, size=sample_size, replace=False)
-    sample_means.append(np.mean(sample))
+# 표본 추출 및 표본 평균 계산 (모든 표본을 한 번에 추출하여 행 단위로 평균)
+# 모집단과 표본 크기가 그대로이면 이전 결과를 재사용하고, 추출 횟수가 늘어난 만큼만 새로 추출합니다.
+if 'simulation_seed' not in st.session_state:
+    st.session_state.simulation_seed = np.random.SeedSequence().entropy # 세션마다 다른 실험 시드
+if 'sample_mean_accumulator' not in st.session_state:
+    st.session_state.sample_mean_accumulator = SampleStatsAccumulator()
+
+draw_batch = make_draw_batch(engine, sample_size, population_mean, population_std, population=population_data)
+
+def draw_sample_batch(count, rng):
+    if use_parallel:
+        # 누적기의 난수열에서 시드를 하나 뽑아 여러 프로세스에 나눠 추출합니다. (작업자 수와 무관하게 재현 가능)
+        return parallel_sample_stats(draw_batch, count, seed=int(rng.integers(2**63)))
+    return draw_batch(count, rng=rng)
+
+sample_means, _ = st.session_state.sample_mean_accumulator.get(
+    (population_mean, population_std, sample_size, use_parallel, engine),
+    st.session_state.simulation_seed,
+    num_samples,
+    draw_sample_batch,
+)
 
 with col2:
     st.subheader(f"표본 평균 분포 (n={sample_size}, 추출 횟수={num_samples})")
-    fig_sample_means, ax_sample_means = plt.subplots(figsize=(8, 5))
-    ax_sample_means.hist(sample_means, bins=30, density=True, alpha=0.7, color='lightgreen', edgecolor='black')
-    ax_sample_means.axvline(np.mean(sample_means), color='blue', linestyle='dashed', linewidth=2, label=f'표본 평균들의 평균 ({np.mean(sample_means):.2f})')
-    ax_sample_means.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 ({population_mean})')
-    ax_sample_means.set_title("표본 평균들의 분포")
-    ax_sample_means.set_xlabel("표본 평균")
-    ax_sample_means.set_ylabel("밀도")
-    ax_sample_means.legend()
-    st.pyplot(fig_sample_means)
+    def draw_sample_means_figure():
+        fig_sample_means, ax_sample_means = plt.subplots(figsize=(8, 5))
+        sample_mean_counts, sample_mean_edges = compute_histogram(sample_means, bins=30, density=True)
+        plot_histogram(ax_sample_means, sample_mean_counts, sample_mean_edges, alpha=0.7, color='lightgreen', edgecolor='black')
+        ax_sample_means.axvline(np.mean(sample_means), color='blue', linestyle='dashed', linewidth=2, label=f'표본 평균들의 평균 ({np.mean(sample_means):.2f})')
+        ax_sample_means.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 ({population_mean})')
+        ax_sample_means.set_title("표본 평균들의 분포")
+        ax_sample_means.set_xlabel("표본 평균")
+        ax_sample_means.set_ylabel("밀도")
+        ax_sample_means.legend()
+        return fig_sample_means
+
+    # 누적기의 generation과 추출 횟수가 같으면 표본 평균 배열도 같으므로 이 값들을 키로 캐시합니다.
+    show_cached_figure(
+        ("01_sample_means", st.session_state.sample_mean_accumulator.generation, num_samples, population_mean, sample_size),
+        draw_sample_means_figure,
+    )
     st.markdown(f"""
     이 그래프는 모집단에서 **표본을 {num_samples}번 추출**하여 얻은 **표본 평균들의 분포**를 보여줍니다.
     **중심극한정리**에 따르면, 표본의 크기($n$)가 충분히 커질수록 표본 평균들의 분포는 모집단의 분포와 상관없이 **정규분포**에 가까워지며,
@@ -95,10 +132,10 @@ confidence_level = st.slider("신뢰수준 (%)", min_value=80, max_value=99, val
 # 사용자가 '새로운 표본으로 계산' 버튼을 누르면 새로운 표본으로 계산하도록 할 수 있습니다.
 # 여기서는 단순화를 위해 sample_means 중 하나를 임의로 선택하거나 새로 추출
 if 'current_sample' not in st.session_state:
-    st.session_state.current_sample = np.random.choice(population_data, size=sample_size, replace=False)
+    st.session_state.current_sample = draw_sample(population_data, sample_size)
 
 if st.button("새로운 표본으로 신뢰구간 계산"):
-    st.session_state.current_sample = np.random.choice(population_data, size=sample_size, replace=False)
+    st.session_state.current_sample = draw_sample(population_data, sample_size)
 
 current_sample = st.session_state.current_sample
 sample_mean_ci = np.mean(current_sample)
@@ -109,10 +146,10 @@ sample_std_ci = np.std(current_sample, ddof=1) # 표본 표준편차 (n-1 자유
 # 실제로는 모르면 t를 사용해야 함. 하지만 활동지 목적상 단순화를 위해 z 사용.
 # 만약 모집단 표준편차를 모른다고 가정하면 t-분포 사용:
 # if sample_size < 30:
-#     t_critical = stats.t.ppf(1 - (100 - confidence_level) / 200, df=sample_size - 1)
+#     t_critical = stats_kernel.t_critical(confidence_level, df=sample_size - 1)
 #     margin_of_error = t_critical * (sample_std_ci / np.sqrt(sample_size))
 # else:
-z_critical = stats.norm.ppf(1 - (100 - confidence_level) / 200) # 양측 검정이므로 1 - alpha/2
+z_critical = lookup_z_critical(confidence_level) # 양측 검정이므로 1 - alpha/2 (미리 계산된 표에서 조회)
 # 모집단 표준편차를 알고 있다고 가정하면
 margin_of_error = z_critical * (population_std / np.sqrt(sample_size)) # 모표준편차 사용
 
@@ -133,16 +170,20 @@ $\\bar{{x}} \\pm \\text{{오차 한계}} = {sample_mean_ci:.2f} \\pm {margin_of_
 **$[{lower_bound:.2f}, {upper_bound:.2f}]$**
 """)
 
-fig_ci, ax_ci = plt.subplots(figsize=(10, 3))
-ax_ci.errorbar(sample_mean_ci, 1, xerr=margin_of_error, fmt='o', color='purple', capsize=5, markersize=8, label=f'${confidence_level}\\%$ 신뢰구간')
-ax_ci.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={population_mean})')
-ax_ci.set_ylim(0.5, 1.5)
-ax_ci.set_xlim(population_mean - 4 * population_std / np.sqrt(sample_size), population_mean + 4 * population_std / np.sqrt(sample_size)) # 적절한 x축 범위 설정
-ax_ci.set_yticks([])
-ax_ci.set_title(f"모평균 {confidence_level}% 신뢰구간")
-ax_ci.set_xlabel("값")
-ax_ci.legend()
-st.pyplot(fig_ci)
+# 표본을 새로 뽑을 때마다 달라지므로 캐시하지 않고, 다른 세션과 겹치지 않도록 show_figure가 잠금 안에서 그립니다.
+def draw_confidence_interval_figure():
+    fig_ci, ax_ci = plt.subplots(figsize=(10, 3))
+    ax_ci.errorbar(sample_mean_ci, 1, xerr=margin_of_error, fmt='o', color='purple', capsize=5, markersize=8, label=f'${confidence_level}\\%$ 신뢰구간')
+    ax_ci.axvline(population_mean, color='red', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={population_mean})')
+    ax_ci.set_ylim(0.5, 1.5)
+    ax_ci.set_xlim(population_mean - 4 * population_std / np.sqrt(sample_size), population_mean + 4 * population_std / np.sqrt(sample_size)) # 적절한 x축 범위 설정
+    ax_ci.set_yticks([])
+    ax_ci.set_title(f"모평균 {confidence_level}% 신뢰구간")
+    ax_ci.set_xlabel("값")
+    ax_ci.legend()
+    return fig_ci
+
+show_figure(draw_confidence_interval_figure)
 
 st.markdown(f"""
 **해석:** 이 ${confidence_level}\\%$ 신뢰구간은 우리가 표본을 통해 추정한 모평균의 '범위'를 의미합니다.
@@ -1,10 +1,18 @@
 import streamlit as st
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
-from scipy import stats
+from matplotlib.collections import LineCollection
+from stats_kernel import t_critical as lookup_t_critical
+from sampling import ENGINES, make_draw_batch, parallel_sample_stats, confidence_intervals, SampleStatsAccumulator
+from population_store import get_population, get_population_histogram
+from histogram import plot_histogram
+from figure_cache import show_cached_figure
 
 st.set_page_config(layout="wide")
 
+MAX_PLOTTED_INTERVALS = 10000 # 그래프에 그릴 신뢰구간의 최대 개수
+
 st.title("신뢰구간 추정의 원리 시각화")
 
 st.sidebar.header("파라미터 설정")
@@ -12,8 +20,10 @@ st.sidebar.header("파라미터 설정")
 # 사용자 입력 파라미터
 pop_mean = st.sidebar.slider("모집단 평균 (μ)", 0, 100, 50)
 pop_std = st.sidebar.slider("모집단 표준편차 (σ)", 1, 30, 10)
-sample_size = st.sidebar.slider("표본 크기 (n)", 5, 200, 30)
-num_samples = st.sidebar.slider("추출할 표본 개수", 10, 1000, 50)
+engine = st.sidebar.selectbox("표본 추출 엔진", list(ENGINES), format_func=ENGINES.get, help="'해석적 분포'는 표본 평균과 표본 분산을 이론적인 분포에서 바로 뽑으므로 표본 크기가 커도 빠릅니다.")
+sample_size = st.sidebar.slider("표본 크기 (n)", 5, 10000 if engine == "analytic" else 200, 30)
+use_parallel = st.sidebar.checkbox("병렬 계산 사용 (대규모 실험)", False, help="여러 CPU 코어에서 표본을 나눠 추출합니다. 표본 개수를 최대 1,000,000개까지 늘릴 수 있습니다.")
+num_samples = st.sidebar.slider("추출할 표본 개수", 10, 1000000 if use_parallel else 10000, 50)
 confidence_level = st.sidebar.slider("신뢰수준 (%)", 80, 99, 95)
 show_details = st.sidebar.checkbox("세부 정보 표시", False)
 
@@ -32,18 +42,24 @@ st.markdown(f"""
 """)
 
 # 모집단 데이터 생성 (시뮬레이션)
-np.random.seed(42) # 재현성을 위해 시드 고정
-population = np.random.normal(loc=pop_mean, scale=pop_std, size=100000)
+# 재현성을 위해 시드를 고정하고, 서버 전체에서 공유되는 읽기 전용 배열을 사용합니다.
+population = get_population("normal", pop_mean, pop_std, 100000, seed=42)
 
 st.header("1. 모집단 분포")
-fig_pop, ax_pop = plt.subplots(figsize=(10, 5))
-ax_pop.hist(population, bins=50, density=True, alpha=0.6, color='g', label='모집단 분포')
-ax_pop.axvline(pop_mean, color='r', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={pop_mean})')
-ax_pop.set_title("모집단 분포 시뮬레이션")
-ax_pop.set_xlabel("값")
-ax_pop.set_ylabel("밀도")
-ax_pop.legend()
-st.pyplot(fig_pop)
+def draw_population_figure():
+    fig_pop, ax_pop = plt.subplots(figsize=(10, 5))
+    # 모집단과 함께 캐시된 히스토그램 구간 값만 그립니다. (모집단 크기와 무관한 그리기 비용)
+    pop_counts, pop_edges = get_population_histogram("normal", pop_mean, pop_std, 100000, seed=42, bins=50)
+    plot_histogram(ax_pop, pop_counts, pop_edges, alpha=0.6, color='g', label='모집단 분포')
+    ax_pop.axvline(pop_mean, color='r', linestyle='dashed', linewidth=2, label=f'모집단 평균 (μ={pop_mean})')
+    ax_pop.set_title("모집단 분포 시뮬레이션")
+    ax_pop.set_xlabel("값")
+    ax_pop.set_ylabel("밀도")
+    ax_pop.legend()
+    return fig_pop
+
+# 입력 값이 같으면 이미 렌더링된 이미지를 그대로 사용합니다.
+show_cached_figure(("02_population", pop_mean, pop_std, 100000, 42), draw_population_figure)
 st.write("모집단은 정규분포를 따른다고 가정하고 시뮬레이션했습니다.")
 
 st.header("2. 표본 추출 및 신뢰구간 추정")
@@ -52,55 +68,66 @@ st.header("2. 표본 추출 및 신뢰구간 추정")
 # 표본 크기가 충분히 크고 모집단 표준편차를 알면 Z-분포 사용
 # 모집단 표준편차를 모를 경우 (일반적인 경우) T-분포 사용
 # 여기서는 일반적인 상황을 가정하여 T-분포 사용
-alpha = 1 - (confidence_level / 100)
 # 자유도는 n-1
-t_critical = stats.t.ppf(1 - alpha / 2, df=sample_size - 1)
-
-covered_count = 0
-results = [] # 각 표본의 결과 저장
-
-fig_ci, ax_ci = plt.subplots(figsize=(12, 10))
-ax_ci.axvline(pop_mean, color='red', linestyle='--', label=f'모집단 평균 (μ={pop_mean})')
-ax_ci.set_xlabel("값")
-ax_ci.set_ylabel("표본")
-ax_ci.set_title(f"각 표본의 {confidence_level}% 신뢰구간")
-ax_ci.set_xlim(pop_mean - 3 * pop_std, pop_mean + 3 * pop_std) # x축 범위 조정
-
-for i in range(num_samples):
-    sample = np.random.choice(population, size=sample_size, replace=False)
-    sample_mean = np.mean(sample)
-    sample_std = np.std(sample, ddof=1) # 표본 표준편차 (n-1로 나눔)
-    
-    # 표준 오차 (Standard Error)
-    se = sample_std / np.sqrt(sample_size)
-    
-    # 신뢰구간 계산
-    margin_of_error = t_critical * se
-    lower_bound = sample_mean - margin_of_error
-    upper_bound = sample_mean + margin_of_error
-    
-    # 모집단 평균이 신뢰구간에 포함되는지 확인
-    is_covered = (lower_bound <= pop_mean <= upper_bound)
-    if is_covered:
-        covered_count += 1
-        color = 'green'
-    else:
-        color = 'red'
-        
-    # 시각화
-    ax_ci.plot([lower_bound, upper_bound], [i, i], color=color, linewidth=2)
-    ax_ci.plot(sample_mean, i, 'o', color='blue', markersize=5) # 표본 평균 표시
-    
-    results.append({
-        "표본 번호": i + 1,
-        "표본 평균": f"{sample_mean:.2f}",
-        "하한": f"{lower_bound:.2f}",
-        "상한": f"{upper_bound:.2f}",
-        "모집단 포함 여부": "O" if is_covered else "X"
-    })
-
-ax_ci.legend()
-st.pyplot(fig_ci)
+t_critical = lookup_t_critical(confidence_level, df=sample_size - 1) # 미리 계산된 표에서 조회
+
+# 모든 표본을 한 번에 추출하여 표본 평균과 표본 표준편차(n-1로 나눔)를 계산
+# 모집단과 표본 크기가 그대로이면 이전 표본을 재사용하고, 표본 개수가 늘어난 만큼만 새로 추출합니다.
+if 'simulation_seed' not in st.session_state:
+    st.session_state.simulation_seed = np.random.SeedSequence().entropy # 세션마다 다른 실험 시드
+if 'ci_sample_accumulator' not in st.session_state:
+    st.session_state.ci_sample_accumulator = SampleStatsAccumulator()
+
+draw_batch = make_draw_batch(engine, sample_size, pop_mean, pop_std, population=population)
+
+def draw_sample_batch(count, rng):
+    if use_parallel:
+        # 누적기의 난수열에서 시드를 하나 뽑아 여러 프로세스에 나눠 추출합니다. (작업자 수와 무관하게 재현 가능)
+        return parallel_sample_stats(draw_batch, count, seed=int(rng.integers(2**63)))
+    return draw_batch(count, rng=rng)
+
+sample_means, sample_stds = st.session_state.ci_sample_accumulator.get(
+    (pop_mean, pop_std, sample_size, use_parallel, engine),
+    st.session_state.simulation_seed,
+    num_samples,
+    draw_sample_batch,
+)
+
+# 모든 표본의 신뢰구간과 모집단 평균 포함 여부를 배열로 한 번에 계산
+lower_bounds, upper_bounds = confidence_intervals(sample_means, sample_stds, sample_size, t_critical)
+is_covered = (lower_bounds <= pop_mean) & (pop_mean <= upper_bounds)
+covered_count = int(is_covered.sum())
+
+# 시각화: 모든 신뢰구간을 하나의 LineCollection으로, 표본 평균을 하나의 scatter로 그립니다.
+# 포함 비율은 모든 표본으로 계산하지만, 그래프와 상세 정보에는 앞의 MAX_PLOTTED_INTERVALS개만 표시합니다.
+num_plotted = min(num_samples, MAX_PLOTTED_INTERVALS)
+sample_index = np.arange(num_plotted)
+
+def draw_ci_figure():
+    fig_ci, ax_ci = plt.subplots(figsize=(12, 10))
+    ax_ci.axvline(pop_mean, color='red', linestyle='--', label=f'모집단 평균 (μ={pop_mean})')
+    ax_ci.set_xlabel("값")
+    ax_ci.set_ylabel("표본")
+    ax_ci.set_title(f"각 표본의 {confidence_level}% 신뢰구간")
+    ax_ci.set_xlim(pop_mean - 3 * pop_std, pop_mean + 3 * pop_std) # x축 범위 조정
+
+    segments = np.stack([
+        np.column_stack([lower_bounds[:num_plotted], sample_index]),
+        np.column_stack([upper_bounds[:num_plotted], sample_index]),
+    ], axis=1)
+    ax_ci.add_collection(LineCollection(segments, colors=np.where(is_covered[:num_plotted], 'green', 'red'), linewidths=2))
+    ax_ci.scatter(sample_means[:num_plotted], sample_index, color='blue', s=25, zorder=3) # 표본 평균 표시
+    ax_ci.set_ylim(-1, num_plotted)
+    ax_ci.legend()
+    return fig_ci
+
+# 누적기의 generation이 같으면 앞의 num_plotted개 표본도 같으므로, 그 값과 신뢰수준 등 그래프 입력 값을 키로 캐시합니다.
+show_cached_figure(
+    ("02_ci", st.session_state.ci_sample_accumulator.generation, num_plotted, confidence_level, pop_mean, pop_std, sample_size),
+    draw_ci_figure,
+)
+if num_plotted < num_samples:
+    st.caption(f"그래프에는 전체 {num_samples:,}개 중 처음 {num_plotted:,}개의 신뢰구간만 표시했습니다.")
 
 coverage_percentage = (covered_count / num_samples) * 100
 
@@ -115,6 +142,13 @@ st.markdown(f"""
 
 if show_details:
     st.subheader("개별 표본 신뢰구간 상세 정보")
+    results = pd.DataFrame({
+        "표본 번호": sample_index + 1,
+        "표본 평균": np.round(sample_means[:num_plotted], 2),
+        "하한": np.round(lower_bounds[:num_plotted], 2),
+        "상한": np.round(upper_bounds[:num_plotted], 2),
+        "모집단 포함 여부": np.where(is_covered[:num_plotted], "O", "X"),
+    })
     st.dataframe(results)
 
 st.header("3. 추가 설명")
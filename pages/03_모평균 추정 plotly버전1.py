@@ -1,19 +1,25 @@
 import streamlit as st
 import numpy as np
 import plotly.graph_objects as go
-from scipy import stats
+from stats_kernel import t_critical as lookup_t_critical, normal_pdf
+from sampling import ENGINES, make_draw_batch, parallel_sample_stats, confidence_intervals
+from histogram import compute_histogram, histogram_bar
 
 st.set_page_config(layout="wide")
 
+MAX_PLOTTED_INTERVALS = 10000 # 그래프에 그릴 신뢰구간의 최대 개수
+
 st.title("📊 모평균 추정 시각화 활동지")
 st.markdown("---")
 
 st.sidebar.header("설정")
 population_mean = st.sidebar.slider("모평균 ($\mu$)", 0, 100, 50)
 population_std = st.sidebar.slider("모표준편차 ($\sigma$)", 1, 30, 10)
-sample_size = st.sidebar.slider("표본 크기 (n)", 5, 200, 30)
+engine = st.sidebar.selectbox("표본 추출 엔진", list(ENGINES), format_func=ENGINES.get, help="'해석적 분포'는 표본 평균과 표본 분산을 이론적인 분포에서 바로 뽑으므로 표본 크기가 커도 빠릅니다.")
+sample_size = st.sidebar.slider("표본 크기 (n)", 5, 10000 if engine == "analytic" else 200, 30)
 num_samples = st.sidebar.slider("표본 추출 횟수", 10, 1000, 100)
 confidence_level = st.sidebar.slider("신뢰수준 (%)", 80, 99, 95)
+use_parallel = st.sidebar.checkbox("병렬 계산 사용 (대규모 실험)", False, help="여러 CPU 코어에서 표본을 나눠 추출합니다. 신뢰구간 개수를 최대 1,000,000개까지 늘릴 수 있습니다.")
 
 st.sidebar.markdown("---")
 st.sidebar.info(
@@ -27,7 +33,7 @@ st.markdown(
 )
 
 x_population = np.linspace(population_mean - 4 * population_std, population_mean + 4 * population_std, 500)
-y_population = stats.norm.pdf(x_population, population_mean, population_std)
+y_population = normal_pdf(x_population, population_mean, population_std)
 
 fig_population = go.Figure(data=go.Scatter(x=x_population, y=y_population, mode='lines', name='모집단 분포', fill='tozeroy'))
 fig_population.update_layout(title="모집단 정규 분포",
@@ -43,13 +49,13 @@ st.markdown(
     "**표본의 크기가 커질수록 표본 평균의 분포는 모집단 분포와 관계없이 정규 분포에 가까워지며, 그 분산이 작아져 더 좁아집니다.** (중심 극한 정리)"
 )
 
-sample_means = []
-for _ in range(num_samples):
-    sample = np.random.normal(population_mean, population_std, sample_size)
-    sample_means.append(np.mean(sample))
+draw_batch = make_draw_batch(engine, sample_size, population_mean, population_std)
+sample_means, _ = draw_batch(num_samples)
 
 fig_sample_means = go.Figure()
-fig_sample_means.add_trace(go.Histogram(x=sample_means, nbinsx=30, name='표본 평균 분포', marker_color='lightblue'))
+# 표본 평균을 서버에서 30개 구간으로 미리 집계하여, 브라우저에는 구간 배열만 보냅니다.
+sample_mean_counts, sample_mean_edges = compute_histogram(sample_means, bins=30)
+fig_sample_means.add_trace(histogram_bar(sample_mean_counts, sample_mean_edges, name='표본 평균 분포', marker_color='lightblue'))
 fig_sample_means.add_vline(x=population_mean, line_dash="dash", line_color="red", annotation_text=f"모평균 ($\mu$) = {population_mean:.2f}")
 
 # 표본 평균의 평균과 표준오차 계산
@@ -89,8 +95,7 @@ st.write(f"**추출된 하나의 표본 표준편차**: {single_sample_std:.2f}"
 
 # t-분포를 사용한 신뢰구간 계산 (모표준편차를 모르는 경우)
 degrees_freedom = sample_size - 1
-alpha = 1 - (confidence_level / 100)
-t_critical = stats.t.ppf(1 - alpha / 2, degrees_freedom)
+t_critical = lookup_t_critical(confidence_level, degrees_freedom) # 미리 계산된 표에서 조회
 
 margin_of_error = t_critical * (single_sample_std / np.sqrt(sample_size))
 confidence_interval_lower = single_sample_mean - margin_of_error
@@ -131,59 +136,64 @@ st.markdown(
     "여러 개의 표본을 추출하여 각각의 신뢰구간을 계산했을 때, 신뢰수준만큼의 신뢰구간이 실제로 모평균을 포함하는지 확인해 보세요."
 )
 
-num_ci_samples = st.slider("신뢰구간을 그릴 표본 개수", 10, 100, 20)
+num_ci_samples = st.slider("신뢰구간을 그릴 표본 개수", 10, 1000000 if use_parallel else 10000, 20)
 st.button("새로운 신뢰구간 그리기", key="draw_new_cis")
 
-ci_data = []
-contained_count = 0
-for i in range(num_ci_samples):
-    sample = np.random.normal(population_mean, population_std, sample_size)
-    sample_mean = np.mean(sample)
-    sample_std = np.std(sample, ddof=1)
-
-    degrees_freedom_ci = sample_size - 1
-    alpha_ci = 1 - (confidence_level / 100)
-    t_critical_ci = stats.t.ppf(1 - alpha_ci / 2, degrees_freedom_ci)
-
-    margin_of_error_ci = t_critical_ci * (sample_std / np.sqrt(sample_size))
-    ci_lower = sample_mean - margin_of_error_ci
-    ci_upper = sample_mean + margin_of_error_ci
-
-    contains_mean = (ci_lower <= population_mean <= ci_upper)
-    if contains_mean:
-        contained_count += 1
-    
-    ci_data.append({
-        'lower': ci_lower,
-        'upper': ci_upper,
-        'mean': sample_mean,
-        'color': 'green' if contains_mean else 'red'
-    })
-
+if use_parallel:
+    # 여러 프로세스에 나눠 추출합니다. 각 블록은 SeedSequence로 나눈 독립 난수열을 사용합니다.
+    ci_sample_means, ci_sample_stds = parallel_sample_stats(draw_batch, num_ci_samples, seed=np.random.SeedSequence().entropy)
+else:
+    ci_sample_means, ci_sample_stds = draw_batch(num_ci_samples)
+
+degrees_freedom_ci = sample_size - 1
+t_critical_ci = lookup_t_critical(confidence_level, degrees_freedom_ci)
+
+# 모든 표본의 신뢰구간과 모평균 포함 여부를 배열로 한 번에 계산
+ci_lower, ci_upper = confidence_intervals(ci_sample_means, ci_sample_stds, sample_size, t_critical_ci)
+contains_mean = (ci_lower <= population_mean) & (population_mean <= ci_upper)
+contained_count = int(contains_mean.sum())
+
+# 구간 개수만큼 trace를 만들지 않고, NaN으로 구간을 끊은 WebGL(Scattergl) trace 몇 개로 모두 그립니다.
+# (포함된 구간 / 포함되지 않은 구간 / 표본 평균 점)
+# 포함 비율은 모든 표본으로 계산하지만, 그래프에는 앞의 MAX_PLOTTED_INTERVALS개만 그립니다.
+num_plotted = min(num_ci_samples, MAX_PLOTTED_INTERVALS)
+ci_lower, ci_upper = ci_lower[:num_plotted], ci_upper[:num_plotted]
+ci_index = np.arange(num_plotted)
+plotted_contains_mean = contains_mean[:num_plotted]
 fig_multi_ci = go.Figure()
-for i, ci in enumerate(ci_data):
-    fig_multi_ci.add_trace(go.Scatter(
-        x=[ci['lower'], ci['upper']],
-        y=[i, i],
+for mask, color in ((plotted_contains_mean, 'green'), (~plotted_contains_mean, 'red')):
+    count = int(mask.sum())
+    x_segments = np.full((count, 3), np.nan)
+    x_segments[:, 0] = ci_lower[mask]
+    x_segments[:, 1] = ci_upper[mask]
+    y_segments = np.full((count, 3), np.nan)
+    y_segments[:, 0] = y_segments[:, 1] = ci_index[mask]
+    fig_multi_ci.add_trace(go.Scattergl(
+        x=x_segments.ravel(),
+        y=y_segments.ravel(),
         mode='lines',
-        line=dict(color=ci['color'], width=2),
-        showlegend=False
-    ))
-    fig_multi_ci.add_trace(go.Scatter(
-        x=[ci['mean']],
-        y=[i],
-        mode='markers',
-        marker=dict(size=5, color='black'),
+        line=dict(color=color, width=2),
+        connectgaps=False,
+        hoverinfo='skip',
         showlegend=False
     ))
+fig_multi_ci.add_trace(go.Scattergl(
+    x=ci_sample_means[:num_plotted],
+    y=ci_index,
+    mode='markers',
+    marker=dict(size=5, color='black'),
+    customdata=np.column_stack([ci_lower, ci_upper]),
+    hovertemplate='표본 %{y}<br>평균 %{x:.2f}<br>[%{customdata[0]:.2f}, %{customdata[1]:.2f}]<extra></extra>',
+    showlegend=False
+))
 
 # 여러 신뢰구간 그래프 역시 각 구간의 명확한 표현을 위해 동적 x축 범위를 사용합니다.
 # 다만, 모든 구간이 잘 보이도록 계산된 구간의 최소/최대 값에 기반하여 범위를 조정합니다.
-if ci_data: # ci_data가 비어있지 않은 경우에만 계산
-    all_ci_points = [point['lower'] for point in ci_data] + [point['upper'] for point in ci_data]
-    ci_plot_x_min = min(all_ci_points) - (max(all_ci_points) - min(all_ci_points)) * 0.1 # 10% 버퍼
-    ci_plot_x_max = max(all_ci_points) + (max(all_ci_points) - min(all_ci_points)) * 0.1 # 10% 버퍼
-else: # ci_data가 비어있으면 기본 범위 설정
+if num_ci_samples > 0: # 구간이 있는 경우에만 계산
+    ci_min, ci_max = ci_lower.min(), ci_upper.max()
+    ci_plot_x_min = ci_min - (ci_max - ci_min) * 0.1 # 10% 버퍼
+    ci_plot_x_max = ci_max + (ci_max - ci_min) * 0.1 # 10% 버퍼
+else: # 구간이 없으면 기본 범위 설정
     ci_plot_x_min = population_mean - 20
     ci_plot_x_max = population_mean + 20
 
@@ -191,11 +201,14 @@ fig_multi_ci.add_vline(x=population_mean, line_dash="dash", line_color="blue", a
 fig_multi_ci.update_layout(title="여러 표본에 대한 신뢰구간",
                            xaxis_title="값",
                            yaxis_title="표본 번호",
-                           height=min(600, num_ci_samples * 20 + 100),
+                           height=min(600, num_plotted * 20 + 100),
                            showlegend=False,
                            xaxis_range=[ci_plot_x_min, ci_plot_x_max]) # 동적 x축 범위 적용
 st.plotly_chart(fig_multi_ci, use_container_width=True)
 
+if num_plotted < num_ci_samples:
+    st.caption(f"그래프에는 전체 {num_ci_samples:,}개 중 처음 {num_plotted:,}개의 신뢰구간만 표시했습니다.")
+
 st.write(f"**모평균을 포함하는 신뢰구간의 수**: {contained_count} / {num_ci_samples}")
 st.write(f"**모평균 포함 비율**: {contained_count / num_ci_samples * 100:.2f}%")
 st.info(f"이 비율은 설정한 신뢰수준({confidence_level}%)에 가까워져야 합니다.")
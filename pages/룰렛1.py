@@ -3,9 +3,12 @@ import random
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
-import time
 import math
 
+from draw_state import DrawState
+from wheel_render import bucketed_pie
+from spin_timer import FRAME_SECONDS, start_timer, timer_progress
+
 # 페이지 설정
 st.set_page_config(
     page_title="학생 발표 순서 추첨 룰렛",
@@ -14,14 +17,20 @@ st.set_page_config(
 )
 
 # 세션 상태 초기화
-if 'excluded_numbers' not in st.session_state:
-    st.session_state.excluded_numbers = []
-if 'draw_history' not in st.session_state:
-    st.session_state.draw_history = []
 if 'total_numbers' not in st.session_state:
     st.session_state.total_numbers = 0
+# 남은 번호와 추첨 기록 (다른 룰렛 페이지와 섞이지 않도록 이 페이지 전용 키를 사용)
+if 'number_draw' not in st.session_state:
+    st.session_state.number_draw = DrawState(st.session_state.total_numbers)
 if 'selected_number' not in st.session_state:
     st.session_state.selected_number = None
+if 'number_spin_timer' not in st.session_state:
+    st.session_state.number_spin_timer = None  # 진행 바 애니메이션의 시작 시각과 재생 시간
+if 'celebrate' not in st.session_state:
+    st.session_state.celebrate = False  # 방금 추첨이 끝나서 결과 메시지를 보여줄지 여부
+
+# 진행 바 애니메이션 재생 시간 (초)
+SPIN_SECONDS = 3.0
 
 def create_roulette_chart(numbers, selected_number=None):
     """룰렛 차트 생성"""
@@ -31,20 +40,25 @@ def create_roulette_chart(numbers, selected_number=None):
     # 색상 생성
     colors = px.colors.qualitative.Set3
     
+    # 번호가 많으면 이웃한 번호를 한 조각으로 묶고 일부 조각에만 글자를 표시합니다. (wheel_render 참고)
+    labels, values, texts, highlighted = bucketed_pie(numbers, selected_number)
+    
     # 선택된 번호가 있을 때 하이라이트
     chart_colors = []
-    for i, num in enumerate(numbers):
-        if selected_number and num == selected_number:
+    for i, is_selected in enumerate(highlighted):
+        if selected_number and is_selected:
             chart_colors.append('#FF6B6B')  # 빨간색으로 하이라이트
         else:
             chart_colors.append(colors[i % len(colors)])
     
     fig = go.Figure(data=[go.Pie(
-        labels=[f"번호 {num}" for num in numbers],
-        values=[1] * len(numbers),
+        labels=labels,
+        values=values,
+        text=texts,
         hole=0.4,
+        sort=False,  # 묶음 크기가 달라도 번호 순서대로 배치
         marker=dict(colors=chart_colors, line=dict(color='#FFFFFF', width=2)),
-        textinfo='label',
+        textinfo='text',
         textfont_size=12,
         hovertemplate='<b>%{label}</b><extra></extra>'
     )])
@@ -62,13 +76,13 @@ def create_roulette_chart(numbers, selected_number=None):
     
     return fig
 
-def draw_number(available_numbers):
-    """번호 추첨 함수"""
-    if not available_numbers:
+def draw_number(draw_state):
+    """번호 추첨 함수 (뽑힌 번호는 제외 목록과 추첨 기록에 바로 반영됩니다)"""
+    if not len(draw_state):
         return None
     
     # 최종 선택
-    selected = random.choice(available_numbers)
+    selected = draw_state.draw()
     return selected
 
 # 메인 UI
@@ -83,7 +97,6 @@ with st.sidebar:
     total_students = st.number_input(
         "전체 학생 수를 입력하세요:",
         min_value=1,
-        max_value=100,
         value=30,
         step=1
     )
@@ -91,9 +104,9 @@ with st.sidebar:
     # 설정 적용 버튼
     if st.button("설정 적용", type="primary"):
         st.session_state.total_numbers = total_students
-        st.session_state.excluded_numbers = []
-        st.session_state.draw_history = []
+        st.session_state.number_draw = DrawState(total_students)
         st.session_state.selected_number = None
+        st.session_state.number_spin_timer = None
         st.success(f"총 {total_students}명으로 설정되었습니다!")
         st.rerun()
     
@@ -101,20 +114,21 @@ with st.sidebar:
     
     # 초기화 버튼
     if st.button("🔄 전체 초기화", type="secondary"):
-        st.session_state.excluded_numbers = []
-        st.session_state.draw_history = []
+        st.session_state.number_draw = DrawState(st.session_state.total_numbers)
         st.session_state.selected_number = None
+        st.session_state.number_spin_timer = None
         st.success("초기화되었습니다!")
         st.rerun()
 
+draw_state = st.session_state.number_draw
+
 # 메인 컨텐츠
 col1, col2 = st.columns([2, 1])
 
 with col1:
     if st.session_state.total_numbers > 0:
         # 현재 사용 가능한 번호들
-        available_numbers = [i for i in range(1, st.session_state.total_numbers + 1) 
-                           if i not in st.session_state.excluded_numbers]
+        available_numbers = draw_state.remaining_sorted()
         
         if available_numbers:
             st.subheader(f"현재 추첨 가능한 번호: {len(available_numbers)}개")
@@ -129,46 +143,51 @@ with col1:
                 fig = create_roulette_chart(available_numbers)
                 st.plotly_chart(fig, use_container_width=True)
             
-            # 추첨 버튼
-            if st.button("🎯 룰렛 돌리기!", type="primary", use_container_width=True):
-                # 간단한 텍스트 애니메이션
-                with st.container():
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # 진행 상황 표시
-                    for i in range(100):
-                        progress_bar.progress(i + 1)
-                        if i < 30:
-                            status_text.info("🎲 룰렛을 돌리고 있습니다...")
-                        elif i < 60:
-                            status_text.info("🌟 번호를 선택하고 있습니다...")
-                        elif i < 90:
-                            status_text.info("⭐ 거의 다 됐습니다...")
+            # 방금 뽑힌 번호가 있으면 결과 메시지를 한 번 보여줍니다.
+            if st.session_state.celebrate:
+                st.success(f"🎉 선택된 번호: **{st.session_state.selected_number}번**")
+                st.balloons()
+                st.session_state.celebrate = False
+            
+            # 추첨 버튼 (돌리는 중에는 누를 수 없음)
+            if st.button("🎯 룰렛 돌리기!", type="primary", use_container_width=True,
+                         disabled=st.session_state.number_spin_timer is not None):
+                # 시작 시각만 기록하고 바로 끝냅니다. 진행 바는 아래 조각(fragment)이 시간에 맞춰 그립니다.
+                st.session_state.number_spin_timer = start_timer(SPIN_SECONDS)
+                st.rerun()
+            
+            if st.session_state.number_spin_timer is not None:
+                # 진행 바 애니메이션: time.sleep으로 기다리지 않고 FRAME_SECONDS마다 이 조각만 다시 실행합니다.
+                @st.fragment(run_every=FRAME_SECONDS)
+                def show_spin_progress():
+                    timer = st.session_state.number_spin_timer
+                    if timer is None: # 다른 실행에서 이미 추첨이 끝난 경우
+                        return
+                    progress = timer_progress(timer)
+                    if progress < 1:
+                        # 진행 상황 표시
+                        st.progress(progress)
+                        if progress < 0.3:
+                            st.info("🎲 룰렛을 돌리고 있습니다...")
+                        elif progress < 0.6:
+                            st.info("🌟 번호를 선택하고 있습니다...")
+                        elif progress < 0.9:
+                            st.info("⭐ 거의 다 됐습니다...")
                         else:
-                            status_text.info("🎯 결과가 나옵니다!")
-                        time.sleep(0.03)
+                            st.info("🎯 결과가 나옵니다!")
+                        return
                     
                     # 최종 선택
-                    selected_number = draw_number(available_numbers)
+                    selected_number = draw_number(draw_state)
                     
+                    # 세션 상태 업데이트 후 페이지 전체를 새로고침 (타이머가 멈추고 결과가 표시됩니다)
+                    st.session_state.number_spin_timer = None
                     if selected_number:
-                        # 세션 상태 업데이트
                         st.session_state.selected_number = selected_number
-                        st.session_state.excluded_numbers.append(selected_number)
-                        st.session_state.draw_history.append(selected_number)
-                        
-                        # 진행 바와 상태 텍스트 제거
-                        progress_bar.empty()
-                        status_text.empty()
-                        
-                        # 결과 메시지
-                        st.success(f"🎉 선택된 번호: **{selected_number}번**")
-                        st.balloons()
-                        
-                        # 페이지 새로고침
-                        time.sleep(1)
-                        st.rerun()
+                        st.session_state.celebrate = True
+                    st.rerun()
+                
+                show_spin_progress()
         else:
             st.info("🎊 모든 학생이 발표를 완료했습니다!")
             st.success("수고하셨습니다!")
@@ -180,22 +199,21 @@ with col2:
     
     if st.session_state.total_numbers > 0:
         # 진행률 표시
-        progress = len(st.session_state.excluded_numbers) / st.session_state.total_numbers
+        progress = draw_state.drawn_count / st.session_state.total_numbers
         st.progress(progress)
-        st.write(f"진행률: {len(st.session_state.excluded_numbers)}/{st.session_state.total_numbers} ({progress*100:.1f}%)")
+        st.write(f"진행률: {draw_state.drawn_count}/{st.session_state.total_numbers} ({progress*100:.1f}%)")
         
         # 추첨 기록
-        if st.session_state.draw_history:
+        if draw_state.history:
             st.subheader("🏆 발표 순서")
-            for i, number in enumerate(st.session_state.draw_history, 1):
-                if i == len(st.session_state.draw_history) and st.session_state.selected_number:
-                    st.write(f"**{i}순: {number}번** ⭐")
-                else:
-                    st.write(f"{i}순: {number}번")
+            # 학교 전체 추첨처럼 기록이 길어도 요소 하나로 보내도록 한 줄씩 이어 붙여 한 번에 표시합니다.
+            order_lines = [f"{i}순: {number}번" for i, number in enumerate(draw_state.history, 1)]
+            if st.session_state.selected_number:
+                order_lines[-1] = f"**{order_lines[-1]}** ⭐"
+            st.markdown("  \n".join(order_lines))
         
         # 남은 번호 표시
-        remaining = [i for i in range(1, st.session_state.total_numbers + 1) 
-                    if i not in st.session_state.excluded_numbers]
+        remaining = draw_state.remaining_sorted()
         
         if remaining:
             st.subheader("⏰ 남은 번호")
@@ -203,11 +221,11 @@ with col2:
             st.write(remaining_str)
     
     # 통계 정보
-    if st.session_state.draw_history:
+    if draw_state.history:
         st.subheader("📈 통계")
         df = pd.DataFrame({
-            '순서': range(1, len(st.session_state.draw_history) + 1),
-            '번호': st.session_state.draw_history
+            '순서': range(1, len(draw_state.history) + 1),
+            '번호': draw_state.history
         })
         st.dataframe(df, use_container_width=True)
 
@@ -0,0 +1,92 @@
+"""모평균 추정 페이지들이 세션 간에 공유하는 읽기 전용 모집단 저장소."""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from histogram import compute_histogram
+
+# 저장소 전체가 사용할 수 있는 최대 메모리 (바이트). 넘으면 가장 오래 사용하지 않은 모집단부터 지웁니다.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 분포 이름 -> 모집단 생성 함수 (rng, 평균, 표준편차, 크기)
+DISTRIBUTIONS = {
+    "normal": lambda rng, mean, std, size: rng.normal(mean, std, size),
+}
+
+
+class PopulationStore:
+    """(분포, μ, σ, 크기, 시드)를 키로 모집단 배열을 보관하는 LRU 저장소."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, distribution, mean, std, size, seed):
+        """모집단을 읽기 전용 NumPy 뷰로 돌려줍니다. 없으면 새로 만들어 저장합니다."""
+        with self._lock:
+            entry = self._get_entry(distribution, mean, std, size, seed)
+        return entry["data"].view()
+
+    def get_histogram(self, distribution, mean, std, size, seed, bins=50, density=True):
+        """모집단의 히스토그램 (구간별 값, 구간 경계)을 돌려줍니다. 모집단과 함께 한 번만 계산해 둡니다."""
+        with self._lock:
+            entry = self._get_entry(distribution, mean, std, size, seed)
+            histogram = entry["histograms"].get((bins, density))
+            if histogram is None:
+                histogram = compute_histogram(entry["data"], bins, density=density)
+                entry["histograms"][(bins, density)] = histogram
+        return histogram
+
+    def _get_entry(self, distribution, mean, std, size, seed):
+        # 호출하는 쪽에서 self._lock을 잡고 있어야 합니다.
+        key = (distribution, float(mean), float(std), int(size), seed)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"data": self._generate(distribution, mean, std, size, seed), "histograms": {}}
+            self._entries[key] = entry
+            self._total_bytes += entry["data"].nbytes
+            self._evict()
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _generate(self, distribution, mean, std, size, seed):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"지원하지 않는 분포입니다: {distribution}")
+        rng = np.random.default_rng(seed)
+        data = DISTRIBUTIONS[distribution](rng, mean, std, size)
+        data.flags.writeable = False
+        return data
+
+    def _evict(self):
+        # 방금 넣은 항목 하나는 한도를 넘더라도 남겨 둡니다.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self._total_bytes -= old["data"].nbytes
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_population_store():
+    """서버 프로세스 전체에서 하나만 존재하는 모집단 저장소."""
+    return PopulationStore()
+
+
+def get_population(distribution, mean, std, size, seed):
+    """공유 저장소에서 모집단을 가져옵니다. 반환된 배열은 수정할 수 없습니다."""
+    return get_population_store().get(distribution, mean, std, size, seed)
+
+
+def get_population_histogram(distribution, mean, std, size, seed, bins=50, density=True):
+    """공유 저장소에서 모집단의 히스토그램 (구간별 값, 구간 경계)을 가져옵니다."""
+    return get_population_store().get_histogram(distribution, mean, std, size, seed, bins=bins, density=density)
@@ -0,0 +1,41 @@
+"""
+브라우저에서 직접 회전 애니메이션을 재생하는 룰렛 컴포넌트.
+
+서버는 회전 한 번에 시작 각도, 목표 각도, 감속 방식(easing), 재생 시간을 한 번만 보내고,
+프레임은 브라우저가 requestAnimationFrame으로 그립니다. 애니메이션이 끝나면 컴포넌트 값으로
+회전 id를 돌려주므로 (스크립트가 다시 실행됨) 서버는 그때 추첨 결과를 확정하면 됩니다.
+"""
+import os
+
+import streamlit.components.v1 as components
+
+from wheel_render import LOD_SETTINGS
+
+_FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend")
+_roulette_wheel = components.declare_component("roulette_wheel", path=_FRONTEND_DIR)
+
+# 브라우저에서 지원하는 감속 방식 (main.py의 서버 애니메이션과 같은 cubic ease-out이 기본값)
+EASINGS = ("cubic-out", "quart-out", "linear")
+
+
+def make_spin(spin_id, start_rotation, final_rotation, result, duration_ms=4000, easing="cubic-out"):
+    """roulette_wheel에 넘길 회전 한 번의 정보."""
+    if easing not in EASINGS:
+        raise ValueError(f"지원하지 않는 감속 방식입니다: {easing}")
+    return {"id": spin_id, "from": start_rotation, "to": final_rotation, "result": result,
+            "duration_ms": duration_ms, "easing": easing}
+
+
+def roulette_wheel(total, drawn, rotation, spin=None, center_text=None, size=350, inner_ratio=0.0, label_ratio=0.7,
+                   key=None):
+    """
+    1번부터 total번까지의 칸을 가진 룰렛을 캔버스 하나에 그립니다. drawn에 있는 번호의 칸은 비워 둡니다.
+    칸이 많으면 wheel_render와 같은 방식으로 묶어서 그리고 포인터 근처만 자세히 그립니다.
+    inner_ratio는 가운데 빈 원, label_ratio는 번호를 놓을 위치의 반지름 비율입니다.
+    spin이 있으면 spin["from"]에서 spin["to"]까지 브라우저에서 회전시키고, 끝나면 spin["id"]를 돌려줍니다.
+    spin이 없으면 rotation 각도로 멈춰 있는 룰렛을 그리고 center_text를 가운데에 표시합니다.
+    반환값은 마지막으로 끝난 회전의 id입니다. (아직 없으면 None)
+    """
+    return _roulette_wheel(total=total, drawn=list(drawn), rotation=rotation, spin=spin,
+                           center_text=center_text, size=size, inner_ratio=inner_ratio, label_ratio=label_ratio,
+                           lod=LOD_SETTINGS, key=key, default=None)
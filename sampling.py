@@ -0,0 +1,244 @@
+"""모평균 추정 페이지(01/02/03)가 함께 사용하는 표본 추출 엔진."""
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+# 한 번에 만들 표본 행렬의 최대 크기 (바이트). 이보다 크면 여러 덩어리로 나눠서 계산합니다.
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+# 표본 추출 엔진 이름 -> 화면에 표시할 이름
+ENGINES = {
+    "reference": "원소별 추출 (기준)",
+    "analytic": "해석적 분포 (정규 모집단 전용, 빠름)",
+}
+
+# 병렬 계산에서 하나의 작업(블록)이 맡는 반복 횟수. 작업자 수와 무관하게 고정되어야 결과가 재현됩니다.
+DEFAULT_BLOCK_SIZE = 50_000
+
+# 누적기가 표본을 새로 쌓기 시작할 때마다 받는 번호 (프로세스 전체에서 겹치지 않음)
+_generations = itertools.count(1)
+
+
+def _get_rng(rng):
+    """rng가 주어지지 않으면 새 Generator를 만듭니다."""
+    return rng if rng is not None else np.random.default_rng()
+
+
+def _uses_rejection(population_size, sample_size):
+    """표본이 모집단에 비해 충분히 작으면 (n² <= N) 중복 재추출 방식을 사용합니다."""
+    return sample_size * sample_size <= population_size
+
+
+def _chunk_bounds(num_samples, row_bytes, chunk_bytes):
+    """(시작, 끝) 행 범위를 chunk_bytes 안에 들어가도록 나눠서 돌려줍니다."""
+    rows = max(1, int(chunk_bytes // max(row_bytes, 1)))
+    for start in range(0, num_samples, rows):
+        yield start, min(start + rows, num_samples)
+
+
+def _rows_with_duplicates(indices):
+    """각 행에 중복된 인덱스가 있는지 여부 (bool 배열)."""
+    sorted_indices = np.sort(indices, axis=1)
+    return (np.diff(sorted_indices, axis=1) == 0).any(axis=1)
+
+
+def sample_indices(rng, population_size, sample_size, num_samples):
+    """
+    크기 population_size인 모집단에서 비복원 추출한 인덱스 행렬 (num_samples, sample_size)을 만듭니다.
+    각 행은 서로 독립인 하나의 표본입니다.
+    """
+    if sample_size > population_size:
+        raise ValueError("표본 크기는 모집단 크기보다 클 수 없습니다.")
+
+    if _uses_rejection(population_size, sample_size):
+        # 복원 추출로 한 번에 뽑은 뒤, 중복이 생긴 행만 다시 뽑습니다.
+        # 중복이 생길 확률은 약 n²/2N 이하이므로 보통 한두 번이면 끝납니다.
+        indices = rng.integers(0, population_size, size=(num_samples, sample_size))
+        bad_rows = np.flatnonzero(_rows_with_duplicates(indices))
+        while bad_rows.size:
+            indices[bad_rows] = rng.integers(0, population_size, size=(bad_rows.size, sample_size))
+            bad_rows = bad_rows[_rows_with_duplicates(indices[bad_rows])]
+        return indices
+
+    # 표본이 큰 경우: 행마다 난수 키를 만들고 가장 작은 n개의 위치를 고릅니다.
+    keys = rng.random((num_samples, population_size))
+    return np.argpartition(keys, sample_size - 1, axis=1)[:, :sample_size]
+
+
+def population_sample_stats(population, sample_size, num_samples, rng=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    모집단 배열에서 크기 sample_size인 표본을 num_samples번 비복원 추출하여
+    각 표본의 평균과 표본 표준편차(ddof=1)를 배열로 돌려줍니다.
+    """
+    rng = _get_rng(rng)
+    population = np.asarray(population)
+    population_size = population.shape[0]
+    means = np.empty(num_samples)
+    stds = np.empty(num_samples)
+
+    if _uses_rejection(population_size, sample_size):
+        row_bytes = sample_size * 8
+    else:
+        row_bytes = population_size * 8
+    for start, end in _chunk_bounds(num_samples, row_bytes, chunk_bytes):
+        samples = population[sample_indices(rng, population_size, sample_size, end - start)]
+        means[start:end] = samples.mean(axis=1)
+        stds[start:end] = samples.std(axis=1, ddof=1)
+    return means, stds
+
+
+def normal_sample_stats(mean, std, sample_size, num_samples, rng=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    정규분포 N(mean, std)에서 크기 sample_size인 표본을 num_samples번 추출하여
+    각 표본의 평균과 표본 표준편차(ddof=1)를 배열로 돌려줍니다.
+    """
+    rng = _get_rng(rng)
+    means = np.empty(num_samples)
+    stds = np.empty(num_samples)
+    for start, end in _chunk_bounds(num_samples, sample_size * 8, chunk_bytes):
+        samples = rng.normal(mean, std, size=(end - start, sample_size))
+        means[start:end] = samples.mean(axis=1)
+        stds[start:end] = samples.std(axis=1, ddof=1)
+    return means, stds
+
+
+def analytic_normal_sample_stats(mean, std, sample_size, num_samples, rng=None):
+    """
+    정규 모집단 N(mean, std)에서 크기 sample_size인 표본을 num_samples번 추출했을 때의
+    표본 평균과 표본 표준편차를 표본 값을 만들지 않고 분포에서 바로 뽑습니다.
+
+    표본 평균은 N(μ, σ/√n)을, (n-1)s²/σ²는 자유도 n-1인 카이제곱 분포를 따르고 둘은 서로 독립이므로
+    반복 한 번의 비용이 n과 무관합니다. (유한 모집단에서의 비복원 추출은 모집단이 충분히 크면 같은 분포로 근사됩니다.)
+    """
+    rng = _get_rng(rng)
+    means = rng.normal(mean, std / np.sqrt(sample_size), num_samples)
+    stds = std * np.sqrt(rng.chisquare(sample_size - 1, num_samples) / (sample_size - 1))
+    return means, stds
+
+
+def make_draw_batch(engine, sample_size, mean, std, population=None):
+    """
+    선택한 엔진으로 (개수, rng=...)를 받아 (표본 평균, 표본 표준편차)를 돌려주는 함수를 만듭니다.
+    "reference"는 표본 값을 실제로 추출하는 기준 엔진이고 (population이 있으면 그 배열에서 비복원 추출),
+    "analytic"은 정규 모집단에 대한 해석적 분포에서 바로 뽑습니다. 결과는 parallel_sample_stats에도 넘길 수 있습니다.
+    """
+    if engine == "analytic":
+        return partial(analytic_normal_sample_stats, mean, std, sample_size)
+    if engine != "reference":
+        raise ValueError(f"지원하지 않는 표본 추출 엔진입니다: {engine}")
+    if population is not None:
+        return partial(population_sample_stats, population, sample_size)
+    return partial(normal_sample_stats, mean, std, sample_size)
+
+
+def draw_sample(population, sample_size, rng=None):
+    """모집단에서 크기 sample_size인 표본 하나를 비복원 추출합니다."""
+    rng = _get_rng(rng)
+    population = np.asarray(population)
+    return population[sample_indices(rng, population.shape[0], sample_size, 1)[0]]
+
+
+def confidence_intervals(means, stds, sample_size, critical_value):
+    """표본 평균/표준편차 배열로부터 모든 표본의 신뢰구간 (하한, 상한) 배열을 한 번에 계산합니다."""
+    margin_of_error = critical_value * np.asarray(stds) / np.sqrt(sample_size)
+    return means - margin_of_error, means + margin_of_error
+
+
+class SampleStatsAccumulator:
+    """
+    (μ, σ, n, 시드)가 같은 동안 이미 추출한 표본 통계량을 보관하는 누적기.
+    표본 개수가 늘어나면 늘어난 만큼만 추가로 추출하고, 줄어들면 앞부분만 잘라서 돌려줍니다.
+
+    같은 시드라도 표본을 몇 번에 나눠 추출했는지에 따라 값이 달라지므로, 결과를 캐시할 때는 입력 값 대신
+    generation과 표본 개수를 키로 씁니다. 한 generation 안에서는 이미 추출한 앞부분이 바뀌지 않습니다.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.generation = None
+        self._rng = None
+        self._means = np.empty(0)
+        self._stds = np.empty(0)
+        self._count = 0
+
+    def _reset(self, key, seed):
+        self.key = (key, seed)
+        self.generation = next(_generations)
+        self._rng = np.random.default_rng(seed)
+        self._means = np.empty(0)
+        self._stds = np.empty(0)
+        self._count = 0
+
+    def _append(self, means, stds):
+        new_count = self._count + len(means)
+        if new_count > len(self._means):
+            # 용량을 두 배씩 늘려서 추가할 때마다 전체를 복사하지 않도록 합니다.
+            capacity = max(new_count, 2 * len(self._means))
+            self._means = np.resize(self._means, capacity)
+            self._stds = np.resize(self._stds, capacity)
+        self._means[self._count:new_count] = means
+        self._stds[self._count:new_count] = stds
+        self._count = new_count
+
+    def get(self, key, seed, num_samples, draw_batch):
+        """
+        num_samples개의 (표본 평균, 표본 표준편차) 배열을 돌려줍니다.
+        draw_batch(개수, rng)는 추가로 필요한 표본의 통계량을 만들어 주는 함수입니다.
+        """
+        if self.key != (key, seed):
+            self._reset(key, seed)
+        if num_samples > self._count:
+            means, stds = draw_batch(num_samples - self._count, self._rng)
+            self._append(means, stds)
+        means, stds = self._means[:num_samples], self._stds[:num_samples]
+        means.flags.writeable = False
+        stds.flags.writeable = False
+        return means, stds
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers):
+    """작업자 수별로 프로세스 풀을 하나씩 만들어 재사용합니다."""
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            # 스레드가 여러 개 돌고 있는 Streamlit 서버에서 fork는 안전하지 않으므로 spawn을 사용합니다.
+            executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _executors[max_workers] = executor
+        return executor
+
+
+def _run_block(draw_batch, seed_sequence, count):
+    return draw_batch(count, rng=np.random.default_rng(seed_sequence))
+
+
+def parallel_sample_stats(draw_batch, num_samples, seed, max_workers=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    반복을 block_size 단위 블록으로 나눠 여러 프로세스에서 draw_batch(개수, rng=...)를 실행하고
+    (표본 평균, 표본 표준편차) 배열을 이어 붙여 돌려줍니다.
+
+    각 블록은 SeedSequence(seed).spawn()으로 만든 독립적인 난수열을 사용하므로,
+    같은 seed라면 작업자 수와 상관없이 항상 같은 결과가 나옵니다.
+    draw_batch는 다른 프로세스로 보낼 수 있어야 합니다. (예: functools.partial(population_sample_stats, 모집단, n))
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    counts = [min(block_size, num_samples - start) for start in range(0, num_samples, block_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(counts))
+
+    if max_workers == 1 or len(counts) <= 1:
+        results = [_run_block(draw_batch, seq, count) for seq, count in zip(seed_sequences, counts)]
+    else:
+        executor = _get_executor(max_workers)
+        results = list(executor.map(_run_block, [draw_batch] * len(counts), seed_sequences, counts))
+
+    if not results:
+        return np.empty(0), np.empty(0)
+    return np.concatenate([means for means, _ in results]), np.concatenate([stds for _, stds in results])
@@ -0,0 +1,40 @@
+"""
+룰렛 페이지들이 time.sleep 없이 회전 애니메이션을 재생하기 위한 타이머.
+
+회전을 시작할 때는 시작 시각과 재생 시간만 session_state에 기록하고, 화면은
+st.fragment(run_every=FRAME_SECONDS)로 만든 조각(fragment)이 그립니다. 조각은 실행될 때마다
+경과 시간에 맞는 프레임 하나만 그리고 바로 끝나므로, 회전하는 동안에도 스크립트 스레드를 붙잡지 않습니다.
+그래서 한 서버에서 여러 교실이 동시에 룰렛을 돌려도 서로 기다리지 않습니다.
+"""
+import time
+
+# 애니메이션 조각을 다시 실행하는 간격 (초). 약 15fps
+FRAME_SECONDS = 1 / 15
+
+# roulette_component.EASINGS와 같은 감속 방식
+EASING_FUNCTIONS = {
+    "cubic-out": lambda progress: 1 - (1 - progress) ** 3,
+    "quart-out": lambda progress: 1 - (1 - progress) ** 4,
+    "linear": lambda progress: progress,
+}
+
+
+def start_timer(duration, **data):
+    """지금부터 duration초 동안 재생할 애니메이션 정보. data는 함께 보관할 값(결과 번호 등)입니다."""
+    return dict(data, started=time.monotonic(), duration=duration)
+
+
+def elapsed_seconds(timer, now=None):
+    return (time.monotonic() if now is None else now) - timer["started"]
+
+
+def timer_progress(timer, now=None):
+    """0부터 1까지의 진행률. 1이면 애니메이션이 끝난 것입니다."""
+    if timer["duration"] <= 0:
+        return 1.0
+    return min(max(elapsed_seconds(timer, now) / timer["duration"], 0.0), 1.0)
+
+
+def eased_progress(timer, easing="cubic-out", now=None):
+    """감속 방식을 적용한 진행률."""
+    return EASING_FUNCTIONS[easing](timer_progress(timer, now))
@@ -0,0 +1,99 @@
+"""
+신뢰구간 계산에 쓰는 z, t 임계값을 미리 계산해 둔 표에서 찾아 주는 작은 통계 모듈.
+
+슬라이더 범위(신뢰수준 80~99%, 자유도 4~199)의 임계값은 critical_values.npz에 저장되어 있어
+scipy를 불러오지 않고 배열 인덱싱만으로 값을 얻습니다. 자유도가 표보다 크면 Cornish-Fisher 전개로,
+표에 없는 신뢰수준(정수가 아닌 값 등)일 때만 scipy.stats를 필요한 순간에 불러와 계산합니다.
+표 파일은 `python stats_kernel.py`로 다시 만들 수 있습니다.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "critical_values.npz")
+
+# 표에 들어 있는 신뢰수준(%)과 자유도 범위
+CONFIDENCE_MIN, CONFIDENCE_MAX = 80, 99
+DF_MIN, DF_MAX = 4, 199
+
+
+def build_tables():
+    """scipy.stats로 z 임계값 (신뢰수준별)과 t 임계값 (신뢰수준 x 자유도) 표를 계산합니다."""
+    from scipy import stats
+
+    levels = np.arange(CONFIDENCE_MIN, CONFIDENCE_MAX + 1)
+    upper_tail = 1 - (100 - levels) / 200 # 양측이므로 1 - alpha/2
+    dfs = np.arange(DF_MIN, DF_MAX + 1)
+    z_table = stats.norm.ppf(upper_tail)
+    t_table = stats.t.ppf(upper_tail[:, None], dfs[None, :])
+    return z_table, t_table
+
+
+@lru_cache(maxsize=1)
+def _load_tables():
+    if os.path.exists(TABLE_PATH):
+        with np.load(TABLE_PATH) as tables:
+            return tables["z"], tables["t"]
+    # 표 파일이 없으면 한 번만 계산해서 메모리에 보관합니다.
+    return build_tables()
+
+
+def _table_index(confidence_level):
+    """신뢰수준이 표에 있는 정수 값이면 행 번호를, 아니면 None을 돌려줍니다."""
+    if float(confidence_level).is_integer() and CONFIDENCE_MIN <= confidence_level <= CONFIDENCE_MAX:
+        return int(confidence_level) - CONFIDENCE_MIN
+    return None
+
+
+@lru_cache(maxsize=256)
+def _scipy_z(confidence_level):
+    from scipy import stats
+    return float(stats.norm.ppf(1 - (100 - confidence_level) / 200))
+
+
+@lru_cache(maxsize=1024)
+def _scipy_t(confidence_level, df):
+    from scipy import stats
+    return float(stats.t.ppf(1 - (100 - confidence_level) / 200, df))
+
+
+def _cornish_fisher_t(z, df):
+    """정규분포 분위수 z로부터 자유도 df인 t 분포 분위수를 근사합니다. (df >= 200에서 오차 1e-10 미만)"""
+    g1 = (z**3 + z) / 4
+    g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+    g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+    g4 = (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df**2 + g3 / df**3 + g4 / df**4
+
+
+def z_critical(confidence_level):
+    """신뢰수준(%)에 해당하는 양측 z 임계값."""
+    row = _table_index(confidence_level)
+    if row is None:
+        return _scipy_z(confidence_level)
+    z_table, _ = _load_tables()
+    return float(z_table[row])
+
+
+def t_critical(confidence_level, df):
+    """신뢰수준(%)과 자유도 df에 해당하는 양측 t 임계값."""
+    row = _table_index(confidence_level)
+    if row is None or df < DF_MIN or not float(df).is_integer():
+        return _scipy_t(confidence_level, df)
+    z_table, t_table = _load_tables()
+    if df > DF_MAX:
+        return float(_cornish_fisher_t(z_table[row], df))
+    return float(t_table[row, int(df) - DF_MIN])
+
+
+def normal_pdf(x, mean, std):
+    """정규분포 N(mean, std)의 확률 밀도 함수."""
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * ((x - mean) / std) ** 2) / (std * np.sqrt(2 * np.pi))
+
+
+if __name__ == "__main__":
+    z_table, t_table = build_tables()
+    np.savez(TABLE_PATH, z=z_table, t=t_table)
+    print(f"{TABLE_PATH}에 임계값 표를 저장했습니다. (z: {z_table.shape}, t: {t_table.shape})")
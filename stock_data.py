@@ -0,0 +1,344 @@
+"""주식 데이터 시각화 페이지(00)가 사용하는 주가 데이터 캐시와 저장소."""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from market_data import FetchScheduler
+
+# 캐시된 주가를 '신선한' 것으로 보는 기본 시간 (초). 지나면 먼저 캐시를 보여주고 뒤에서 새로 받아옵니다.
+DEFAULT_TTL_SECONDS = 60 * 60
+
+# 주가 캐시 전체가 사용할 수 있는 최대 메모리 (바이트). 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 티커별 Parquet 파일을 저장할 기본 폴더
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".price_store")
+
+
+def trading_day_window(years=3, now=None):
+    """
+    최근 years년 구간을 거래일 경계로 맞춘 (시작일, 종료일)을 돌려줍니다.
+    종료일은 마지막 거래일(주말이면 직전 금요일) 다음 날 0시이므로 (yfinance의 end는 포함되지 않음)
+    같은 거래일 안에서는 몇 번을 호출해도 같은 값이 나와 캐시 키가 바뀌지 않습니다.
+    """
+    last_trading_day = pd.Timestamp(now if now is not None else pd.Timestamp.now()).normalize()
+    if last_trading_day.dayofweek >= 5: # 토요일(5), 일요일(6)이면 직전 금요일로
+        last_trading_day -= pd.Timedelta(days=last_trading_day.dayofweek - 4)
+    end = last_trading_day + pd.Timedelta(days=1)
+    start = end - pd.Timedelta(days=years * 365)
+    return start.to_pydatetime(), end.to_pydatetime()
+
+
+class PriceCache:
+    """
+    (티커 목록, 기간 길이)별로 마지막으로 받아온 주가 데이터를 보관하는 LRU 캐시 (stale-while-revalidate).
+    TTL이 지났거나 거래일이 바뀌어 요청 구간이 밀리면 기존 데이터를 바로 돌려주고, 새 구간은 백그라운드에서 받아옵니다.
+    캐시에 아무것도 없을 때만 요청한 쪽이 다운로드를 기다립니다.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_refresh_workers=2, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # (source, 티커 튜플, 기간 길이) -> {"data", "window", "fetched_at", "nbytes"}
+        self._total_bytes = 0
+        self._refreshing = set() # 백그라운드에서 받아오는 중인 (키, 구간)
+        self._lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=max_refresh_workers, thread_name_prefix="price-refresh")
+
+    def get(self, tickers, start, end, fetch, source=None, years=None):
+        """
+        (데이터, 오래된 데이터 여부)를 돌려줍니다.
+        fetch(tickers, start, end)는 실제로 주가를 받아오는 함수이며 백그라운드 스레드에서도 호출되므로
+        st.* 함수를 사용하면 안 됩니다. source는 데이터 제공자를 구분하는 이름, years는 기간 길이로 둘 다 캐시 키에 포함됩니다.
+        """
+        key = (source, tuple(tickers), years)
+        window = (start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            data = fetch(list(key[1]), start, end)
+            self._store(key, window, data)
+            return data, False
+
+        is_stale = entry["window"] != window or time.monotonic() - entry["fetched_at"] > self.ttl_seconds
+        if is_stale:
+            self._refresh_in_background(key, window, fetch)
+        return entry["data"], is_stale
+
+    def _store(self, key, window, data):
+        # 빈 결과(다운로드 실패)는 저장하지 않아 다음 요청에서 다시 시도하도록 합니다.
+        if data is None or data.empty:
+            return
+        nbytes = int(data.memory_usage(index=True).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old["nbytes"]
+                # 늦게 끝난 이전 구간의 갱신이 더 새로운 구간을 덮어쓰지 않도록 합니다.
+                if old["window"][1] > window[1]:
+                    data, window, nbytes = old["data"], old["window"], old["nbytes"]
+            self._entries[key] = {"data": data, "window": window, "fetched_at": time.monotonic(), "nbytes": nbytes}
+            self._total_bytes += nbytes
+            # 방금 넣은 항목 하나는 한도를 넘더라도 남겨 둡니다.
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._total_bytes -= old["nbytes"]
+
+    def _refresh_in_background(self, key, window, fetch):
+        with self._lock:
+            if (key, window) in self._refreshing:
+                return
+            self._refreshing.add((key, window))
+
+        def refresh():
+            try:
+                self._store(key, window, fetch(list(key[1]), *window))
+            finally:
+                with self._lock:
+                    self._refreshing.discard((key, window))
+
+        self._refresh_executor.submit(refresh)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_price_cache(ttl_seconds=DEFAULT_TTL_SECONDS):
+    """서버 프로세스 전체에서 공유하는 주가 캐시. (TTL 값별로 하나씩)"""
+    return PriceCache(ttl_seconds=ttl_seconds)
+
+
+@st.cache_resource
+def get_fetch_scheduler(max_workers=8, timeout=30.0, retries=2):
+    """
+    서버 프로세스 전체에서 공유하는 티커별 다운로드 스케줄러.
+    여러 세션이 동시에 받아와도 전체 동시 요청 수는 max_workers를 넘지 않습니다.
+    """
+    return FetchScheduler(max_workers=max_workers, timeout=timeout, retries=retries)
+
+
+def split_by_ticker(data, tickers):
+    """yf.download(group_by='ticker') 형태의 DataFrame을 {티커: OHLCV DataFrame}으로 나눕니다."""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                frame = data[ticker].dropna(how="all")
+                if not frame.empty:
+                    frames[ticker] = frame
+    elif len(tickers) == 1: # 단일 티커 요청 시 컬럼이 단일 레벨일 수 있음
+        frame = data.dropna(how="all")
+        if not frame.empty:
+            frames[tickers[0]] = frame
+    return frames
+
+
+# 날짜 정렬 방식: 종목마다 상장(데이터 시작)일이 달라도 각자의 기록을 유지할지,
+# 모든 종목의 데이터가 있는 날짜부터만 보여줄지 정합니다.
+ALIGNMENT_POLICIES = {
+    "per_ticker": "종목별 시작일 유지",
+    "common": "공통 구간만 (모든 종목이 있는 날짜부터)",
+}
+
+
+def extract_close_prices(data, tickers, ffill_limit=5, alignment="per_ticker", field="Close"):
+    """
+    yf.download(group_by='ticker') 형태의 DataFrame에서 종가만 골라 (날짜 x 티커) float32 DataFrame으로 돌려줍니다.
+    멀티인덱스 교차 구간(xs)으로 한 번에 뽑아 티커별로 열을 하나씩 붙이며 복사하지 않습니다.
+
+    - 종목별 첫 거래일 이전은 NaN으로 남기므로 늦게 상장한 종목 때문에 다른 종목의 기록이 잘리지 않습니다.
+    - 첫 거래일 이후 중간에 빠진 날짜는 직전 종가로 최대 ffill_limit일까지만 채웁니다.
+    - 모든 종목이 비어 있는 날짜(휴장일 등)만 지웁니다. alignment="common"이면 모든 종목이 있는 날짜부터 시작합니다.
+    """
+    if data is None or data.empty:
+        return pd.DataFrame(dtype=np.float32)
+    if isinstance(data.columns, pd.MultiIndex):
+        if field not in data.columns.get_level_values(1):
+            return pd.DataFrame(dtype=np.float32)
+        close = data.xs(field, axis=1, level=1)
+        close = close.loc[:, ~close.columns.duplicated()]
+        present = [ticker for ticker in tickers if ticker in close.columns]
+    elif len(tickers) == 1 and field in data.columns: # 단일 티커 요청 시 컬럼이 단일 레벨일 수 있음
+        close = data[[field]].set_axis(tickers, axis=1)
+        present = list(tickers)
+    else:
+        return pd.DataFrame(dtype=np.float32)
+
+    values = close.reindex(columns=present).to_numpy(dtype=np.float32)
+    close = pd.DataFrame(values, index=close.index, columns=present).sort_index()
+    if ffill_limit:
+        close = close.ffill(limit=ffill_limit) # 첫 거래일 이전의 NaN은 채우지 않습니다.
+    close = close.dropna(how="all").dropna(axis=1, how="all")
+    if alignment == "common" and not close.empty:
+        close = close.iloc[_first_valid_rows(close.to_numpy()).max():]
+    return close
+
+
+def _first_valid_rows(values):
+    """(날짜 x 티커) 배열에서 티커별 첫 번째 NaN이 아닌 행 번호."""
+    return (~np.isnan(values)).argmax(axis=0)
+
+
+def normalize_prices(close_prices, base=100):
+    """각 종목의 첫 번째 유효한 종가를 base로 맞춰 정규화합니다. (종목마다 시작일이 달라도 됩니다)"""
+    values = close_prices.to_numpy()
+    first_prices = values[_first_valid_rows(values), np.arange(values.shape[1])]
+    return close_prices / first_prices * base
+
+
+class ParquetPriceStore:
+    """
+    티커별 주가(OHLCV)를 Parquet 파일로 보관하는 디스크 저장소.
+    티커마다 지금까지 확인한 날짜 구간을 manifest.json에 기록해 두고,
+    요청 구간 중 아직 확인하지 않은 앞부분과, 마지막으로 저장한 봉부터의 뒷부분만 fetch로 받아와 이어 붙입니다.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, f"{ticker}.parquet")
+
+    def _read_manifest(self):
+        path = os.path.join(self.directory, self.MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, self.MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def _read(self, ticker):
+        path = self._path(ticker)
+        return pd.read_parquet(path) if os.path.exists(path) else None
+
+    def _write(self, ticker, frame):
+        tmp_path = self._path(ticker) + ".tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(ticker))
+
+    def last_bar(self, ticker):
+        """저장된 마지막 봉의 날짜 (없으면 None)."""
+        return self._manifest.get(ticker, {}).get("last_bar")
+
+    def _missing_ranges(self, ticker, start, end):
+        info = self._manifest.get(ticker)
+        if info is None:
+            return [(start, end)]
+        covered_start, covered_end = pd.Timestamp(info["covered_start"]), pd.Timestamp(info["covered_end"])
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        # 마지막으로 저장한 봉은 장중에 받은 미완성 봉일 수 있으므로, 확인한 구간과 상관없이
+        # 항상 그 봉부터 end까지 다시 받아 덮어씁니다. (TTL이 지나면 오늘 시세가 갱신됩니다)
+        tail_start = covered_end
+        if info.get("last_bar"):
+            tail_start = min(tail_start, pd.Timestamp(info["last_bar"]))
+        if end > tail_start:
+            ranges.append((tail_start, end))
+        return ranges
+
+    def load(self, tickers, start, end, fetch):
+        """
+        [start, end) 구간의 주가를 yf.download(group_by='ticker')와 같은 모양으로 돌려줍니다.
+        fetch(tickers, start, end)는 저장소에 없는 구간을 받아오는 함수이며,
+        같은 구간이 빠진 티커들은 한 번의 fetch 호출로 묶어서 받아옵니다.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        with self._lock:
+            # 빠진 구간이 같은 티커끼리 묶기
+            groups = defaultdict(list)
+            for ticker in tickers:
+                for missing in self._missing_ranges(ticker, start, end):
+                    groups[missing].append(ticker)
+
+        # 다운로드는 잠금 없이 합니다. (느린 티커 하나 때문에 다른 세션의 저장소 읽기가 기다리지 않도록)
+        # 두 세션이 같은 구간을 동시에 받아오더라도 아래에서 날짜 기준으로 합치므로 결과는 같습니다.
+        results = []
+        for (fetch_start, fetch_end), group in groups.items():
+            data = fetch(group, fetch_start.to_pydatetime(), fetch_end.to_pydatetime())
+            results.append((fetch_start, fetch_end, group, split_by_ticker(data, group)))
+
+        with self._lock:
+            manifest_changed = False
+            fetched = defaultdict(list)
+            for fetch_start, fetch_end, group, received in results:
+                for ticker, frame in received.items():
+                    fetched[ticker].append(frame)
+                for ticker in group:
+                    # 데이터를 받은 티커, 또는 다른 티커는 받았는데 이 티커만 새 봉이 없는 경우(휴장일 등)
+                    # 이미 저장된 티커만 확인한 구간으로 기록합니다. 다운로드 실패는 다음에 다시 시도합니다.
+                    if ticker in received or (received and ticker in self._manifest):
+                        manifest_changed |= self._mark_covered(ticker, fetch_start, fetch_end)
+
+            frames = {}
+            for ticker in tickers:
+                stored = self._read(ticker)
+                if fetched.get(ticker):
+                    parts = ([stored] if stored is not None else []) + fetched[ticker]
+                    stored = pd.concat(parts).sort_index()
+                    stored = stored[~stored.index.duplicated(keep="last")]
+                    self._write(ticker, stored)
+                    self._manifest[ticker]["last_bar"] = stored.index[-1].isoformat()
+                    manifest_changed = True
+                if stored is not None:
+                    window = stored.loc[(stored.index >= start) & (stored.index < end)]
+                    if not window.empty:
+                        frames[ticker] = window
+            # 저장소에서 읽기만 한 경우에는 manifest.json을 다시 쓰지 않습니다.
+            if manifest_changed:
+                self._write_manifest()
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    def _mark_covered(self, ticker, start, end):
+        """[start, end) 구간을 확인한 구간으로 기록하고, 기록이 바뀌었는지 돌려줍니다."""
+        info = self._manifest.get(ticker)
+        if info is None:
+            self._manifest[ticker] = {"covered_start": start.isoformat(), "covered_end": end.isoformat(), "last_bar": None}
+            return True
+        covered = (info["covered_start"], info["covered_end"])
+        info["covered_start"] = min(pd.Timestamp(info["covered_start"]), start).isoformat()
+        info["covered_end"] = max(pd.Timestamp(info["covered_end"]), end).isoformat()
+        return covered != (info["covered_start"], info["covered_end"])
+
+
+@st.cache_resource
+def get_price_store(directory=DEFAULT_STORE_DIR):
+    """서버 프로세스 전체에서 공유하는 디스크 주가 저장소."""
+    return ParquetPriceStore(directory)
@@ -0,0 +1,69 @@
+"""
+주가 행렬 전체에 대한 선형 추세선(최소제곱) 계산.
+
+statsmodels로 종목 하나씩 적합하는 대신, 정규방정식의 닫힌 해를 (날짜 x 티커) 행렬의 합으로 한 번에 계산합니다.
+NaN(상장 전, 채우지 않은 결측)은 계산에서 빠집니다.
+"""
+import numpy as np
+
+
+def _masked(values):
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    return np.where(valid, values, 0.0), valid
+
+
+def _fit(n, sx, sy, sxx, sxy, syy):
+    """합계들로부터 (기울기, 절편, R²)을 계산합니다. 점이 두 개 미만이거나 x 분산이 0이면 NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxx_c = n * sxx - sx**2
+        sxy_c = n * sxy - sx * sy
+        syy_c = n * syy - sy**2
+        slope = np.where((n >= 2) & (sxx_c > 0), sxy_c / sxx_c, np.nan)
+        intercept = (sy - slope * sx) / n
+        # 값이 모두 같으면 (분산 0) 추세선이 데이터를 완벽히 설명하므로 R² = 1로 둡니다.
+        r_squared = np.where(syy_c > 0, sxy_c**2 / (sxx_c * syy_c), 1.0)
+        r_squared = np.where(np.isnan(slope), np.nan, r_squared)
+    return slope, intercept, r_squared
+
+
+def linear_trends(values):
+    """
+    각 열(티커)에 대해 y = 절편 + 기울기 * x 를 최소제곱으로 적합합니다.
+    x는 그 티커의 유효한 값에 0, 1, 2, ... 순서로 붙인 번호입니다.
+    {"slope", "intercept", "r_squared" (티커별 배열), "fitted" (날짜 x 티커, 유효하지 않은 날은 NaN)}을 돌려줍니다.
+    """
+    y, valid = _masked(values)
+    x = np.where(valid, np.cumsum(valid, axis=0) - 1, 0).astype(np.float64)
+    n = valid.sum(axis=0).astype(np.float64)
+    slope, intercept, r_squared = _fit(n, x.sum(axis=0), y.sum(axis=0), (x * x).sum(axis=0),
+                                       (x * y).sum(axis=0), (y * y).sum(axis=0))
+    fitted = np.where(valid, intercept + slope * x, np.nan)
+    return {"slope": slope, "intercept": intercept, "r_squared": r_squared, "fitted": fitted}
+
+
+def rolling_trends(values, window):
+    """
+    각 날짜에서 끝나는 최근 window개 날짜로 적합한 이동 추세를 누적합으로 한 번에 계산합니다.
+    {"slope", "r_squared", "fitted" (구간 끝 날짜의 추세선 값)} 모두 (날짜 x 티커) 배열이며,
+    구간 안에 유효한 값이 window개보다 적으면 NaN입니다.
+    """
+    y, valid = _masked(values)
+    x = np.arange(y.shape[0], dtype=np.float64)[:, None]
+    xm = np.where(valid, x, 0.0)
+
+    def window_sums(a):
+        cumulative = np.concatenate([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+        sums = np.full(a.shape, np.nan)
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+        return sums
+
+    n = window_sums(valid.astype(np.float64))
+    slope, intercept, r_squared = _fit(n, window_sums(xm), window_sums(y), window_sums(xm * xm),
+                                       window_sums(xm * y), window_sums(y * y))
+    complete = n >= window
+    return {
+        "slope": np.where(complete, slope, np.nan),
+        "r_squared": np.where(complete, r_squared, np.nan),
+        "fitted": np.where(complete & valid, intercept + slope * x, np.nan),
+    }
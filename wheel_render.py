@@ -0,0 +1,268 @@
+"""
+룰렛 바퀴를 참가 인원과 상관없이 일정한 개수의 요소로 그리는 렌더러. (main.py, 룰렛1, 룰렛2 공용)
+
+칸이 DETAIL_LIMIT개 이하이면 칸마다 부채꼴과 번호를 그립니다. 그보다 많으면 이웃한 칸들을 묶어
+묶음(bucket) 하나를 부채꼴 하나로 그리고, 번호는 일부 묶음에만 붙입니다. 포인터 근처의 칸만
+원래 크기로 다시 그려서, 몇 명이 참여하든 만들어지는 SVG 요소 수는 일정 한도 안에 머뭅니다.
+
+각도는 모두 12시 방향에서 시계 방향으로 잰 값(도)이며, main.py의 rotate(각도) translateY(-r) 배치와 같습니다.
+
+칸 구성(남은 번호)과 크기가 같으면 바퀴 그림과 페이지 HTML 조각은 WheelCache에 한 번만 만들어 두고,
+애니메이션 프레임마다는 회전 각도에서 나오는 부분(회전 transform, 포인터 근처 칸)만 새로 만듭니다.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+# 이 개수 이하의 칸은 모두 자세히 (칸마다 부채꼴과 번호) 그립니다.
+DETAIL_LIMIT = 72
+# 칸이 많을 때 그릴 최대 부채꼴(묶음) 수와 최대 번호 표시 수
+MAX_BUCKETS = 90
+MAX_LABELS = 24
+# 칸이 많을 때 포인터 양쪽으로 원래 크기로 그릴 칸 수
+POINTER_DETAIL = 6
+
+# 캐시 전체가 사용할 수 있는 최대 메모리 (바이트, 문자열 길이 기준). 넘으면 가장 오래 사용하지 않은 항목부터 지웁니다.
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# 바퀴 하나가 기억해 둘 포인터 근처 그림(overlay)의 최대 개수
+MAX_OVERLAYS = 256
+
+# 브라우저 컴포넌트(roulette_component)에도 같은 값을 넘겨 서버 렌더링과 같은 방식으로 그리게 합니다.
+LOD_SETTINGS = {"detail_limit": DETAIL_LIMIT, "max_buckets": MAX_BUCKETS,
+                "max_labels": MAX_LABELS, "pointer_detail": POINTER_DETAIL}
+
+# main.py 룰렛의 색상 팔레트
+ROULETTE_COLORS = [
+    "#FFD700", "#FF6347", "#6A5ACD", "#32CD32", "#8A2BE2",
+    "#FF4500", "#1E90FF", "#DAA520", "#DC143C", "#00CED1",
+    "#FF8C00", "#4B0082", "#7FFF00", "#BA55D3", "#F0E68C",
+    "#ADD8E6", "#FFA07A", "#90EE90", "#DDA0DD", "#FFE4B5",
+    "#87CEEB", "#FFDAB9", "#BDB76B", "#FA8072", "#AFEEEE",
+    "#F4A460", "#EE82EE", "#00FA9A", "#FFC0CB", "#6495ED"
+]
+
+
+def bucket_slots(slots, max_buckets=MAX_BUCKETS):
+    """
+    연속한 칸들을 최대 max_buckets개의 묶음으로 나눕니다. slots는 칸 순서대로의 번호 배열이며 0은 빈 칸입니다.
+    (묶음 시작 칸 위치, 묶음별 칸 수, 묶음별 남은 번호 수, 첫 번호, 마지막 번호) 배열을 돌려줍니다.
+    """
+    slots = np.asarray(slots, dtype=np.int64)
+    bucket_size = max(1, math.ceil(len(slots) / max_buckets))
+    starts = np.arange(0, len(slots), bucket_size)
+    if len(starts) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty
+    filled = slots > 0
+    sizes = np.diff(np.append(starts, len(slots)))
+    occupied = np.add.reduceat(filled.astype(np.int64), starts)
+    first = np.minimum.reduceat(np.where(filled, slots, np.iinfo(np.int64).max), starts)
+    last = np.maximum.reduceat(slots, starts)
+    return starts, sizes, occupied, first, last
+
+
+def _point(center, radius, angle):
+    radians = math.radians(angle)
+    return center + radius * math.sin(radians), center - radius * math.cos(radians)
+
+
+def sector_path(center, outer, inner, start, end):
+    """start도부터 end도까지의 부채꼴 (inner > 0이면 가운데가 빈 고리 모양) SVG path 데이터."""
+    if end - start >= 359.99: # 한 바퀴 전체는 호 하나로 그릴 수 없으므로 반으로 나눕니다.
+        middle = start + (end - start) / 2
+        return sector_path(center, outer, inner, start, middle) + sector_path(center, outer, inner, middle, end)
+    large = 1 if end - start > 180 else 0
+    x0, y0 = _point(center, outer, start)
+    x1, y1 = _point(center, outer, end)
+    if inner > 0:
+        x2, y2 = _point(center, inner, end)
+        x3, y3 = _point(center, inner, start)
+        return (f"M{x0:.2f},{y0:.2f}A{outer:.2f},{outer:.2f} 0 {large} 1 {x1:.2f},{y1:.2f}"
+                f"L{x2:.2f},{y2:.2f}A{inner:.2f},{inner:.2f} 0 {large} 0 {x3:.2f},{y3:.2f}Z")
+    return f"M{center:.2f},{center:.2f}L{x0:.2f},{y0:.2f}A{outer:.2f},{outer:.2f} 0 {large} 1 {x1:.2f},{y1:.2f}Z"
+
+
+def _label(center, radius, angle, text, font_size, weight=None):
+    # 번호는 칸 방향을 따라 눕혀 쓰므로 바퀴가 돌아도 다시 배치할 필요가 없습니다.
+    # weight가 없으면 바깥 <svg>/<g>의 글자 굵기를 따릅니다.
+    x, y = _point(center, radius, angle)
+    weight_attr = f' font-weight="{weight}"' if weight else ""
+    return (f'<text x="{x:.2f}" y="{y:.2f}" transform="rotate({angle:.2f} {x:.2f} {y:.2f})" '
+            f'font-size="{font_size:.1f}"{weight_attr} text-anchor="middle" '
+            f'dominant-baseline="central">{text}</text>')
+
+
+class WheelGeometry:
+    """
+    칸 구성(slots)과 크기별로 고정된 바퀴 그림. 회전과 상관없는 부분(static)과,
+    회전 각도에 따라 포인터 근처만 다시 그리는 부분(overlay)을 나눠서 만듭니다.
+    """
+
+    def __init__(self, slots, size, colors=ROULETTE_COLORS, inner_ratio=0.0, label_ratio=None):
+        self.slots = np.asarray(slots, dtype=np.int64)
+        self.size = size
+        self.colors = list(colors)
+        self.center = size / 2
+        self.outer = size / 2
+        self.inner = self.outer * inner_ratio
+        self.label_radius = self.outer * (label_ratio if label_ratio is not None else (1 + inner_ratio) / 2)
+        self.step = 360 / max(len(self.slots), 1)
+        self.detailed = len(self.slots) <= DETAIL_LIMIT
+        self.static = self._static_layer()
+        self._svg_open = (f'<svg width="{self.size}" height="{self.size}" viewBox="0 0 {self.size} {self.size}" '
+                          f'xmlns="http://www.w3.org/2000/svg" style="display: block;">')
+        self._templates = {} # 페이지별 정적 HTML 조각
+        self._overlays = {} # (포인터 칸 위치, 강조 번호) -> 포인터 근처 그림
+
+    def _font_size(self, span):
+        # 칸 폭(호의 길이)에 맞춘 글자 크기
+        return min(16.0, max(8.0, self.label_radius * math.radians(span) * 0.55))
+
+    def _slot_parts(self, index, weight=None, stroke=None):
+        number = int(self.slots[index])
+        start = index * self.step
+        stroke_attr = f' stroke="{stroke}" stroke-width="3"' if stroke else ' stroke="#fff" stroke-width="0.5"'
+        return [f'<path d="{sector_path(self.center, self.outer, self.inner, start, start + self.step)}" '
+                f'fill="{self.colors[index % len(self.colors)]}"{stroke_attr}/>',
+                _label(self.center, self.label_radius, start + self.step / 2, number,
+                       self._font_size(self.step) * (1.15 if weight == "bold" else 1), weight)]
+
+    def _static_layer(self):
+        parts = []
+        if self.detailed:
+            for index in np.flatnonzero(self.slots > 0):
+                parts.extend(self._slot_parts(index))
+            return "".join(parts)
+        starts, sizes, occupied, first, last = bucket_slots(self.slots)
+        label_every = max(1, math.ceil(len(starts) / MAX_LABELS))
+        labels = []
+        for bucket, (start, size) in enumerate(zip(starts, sizes)):
+            if occupied[bucket] == 0:
+                continue
+            start_angle, end_angle = start * self.step, (start + size) * self.step
+            parts.append(f'<path d="{sector_path(self.center, self.outer, self.inner, start_angle, end_angle)}" '
+                         f'fill="{self.colors[bucket % len(self.colors)]}" stroke="#fff" stroke-width="0.5"/>')
+            if bucket % label_every == 0:
+                labels.append(_label(self.center, self.label_radius, (start_angle + end_angle) / 2, int(first[bucket]),
+                                     self._font_size(self.step * size * label_every) * 0.8))
+        return "".join(parts + labels)
+
+    def pointer_index(self, rotation):
+        """rotation만큼 돌았을 때 포인터(12시 방향)가 가리키는 칸의 위치."""
+        if len(self.slots) == 0:
+            return None
+        return int(((-rotation) % 360) // self.step) % len(self.slots)
+
+    def overlay(self, rotation, highlight=None):
+        """
+        포인터 근처 칸(칸이 많을 때)과 강조할 번호의 칸을 원래 크기로 그린 SVG 조각.
+        결과는 포인터가 가리키는 칸이 바뀔 때만 달라지므로 (칸 위치, 강조 번호)별로 기억해 둡니다.
+        """
+        center_index = None if self.detailed else self.pointer_index(rotation)
+        key = (center_index, highlight)
+        overlay = self._overlays.get(key)
+        if overlay is None:
+            if len(self._overlays) >= MAX_OVERLAYS:
+                self._overlays.clear()
+            overlay = self._overlays[key] = self._overlay(center_index, highlight)
+        return overlay
+
+    def _overlay(self, center_index, highlight):
+        parts = []
+        if center_index is not None:
+            for offset in range(-POINTER_DETAIL, POINTER_DETAIL + 1):
+                index = (center_index + offset) % len(self.slots)
+                if self.slots[index] > 0:
+                    parts.extend(self._slot_parts(index))
+        if highlight is not None:
+            positions = np.flatnonzero(self.slots == highlight)
+            if len(positions):
+                parts.extend(self._slot_parts(positions[0], weight="bold", stroke="#333"))
+        return "".join(parts)
+
+    def svg(self, rotation=0.0, highlight=None):
+        """rotation만큼 돌린 바퀴 전체의 SVG 문자열."""
+        return (f'{self._svg_open}<g transform="rotate({rotation:.2f} {self.center:.2f} {self.center:.2f})" '
+                f'font-family="sans-serif" fill="#333">{self.static}{self.overlay(rotation, highlight)}</g></svg>')
+
+    def template(self, name, build):
+        """
+        build(geometry)가 만드는 정적 HTML 조각들(튜플)을 name별로 한 번만 만들어 보관합니다.
+        페이지는 프레임마다 이 조각들 사이에 회전 각도와 overlay만 끼워 넣습니다.
+        """
+        pieces = self._templates.get(name)
+        if pieces is None:
+            pieces = self._templates[name] = tuple(build(self))
+        return pieces
+
+    @property
+    def nbytes(self):
+        """보관 중인 문자열의 대략적인 크기."""
+        return (self.slots.nbytes + len(self.static)
+                + sum(len(piece) for pieces in self._templates.values() for piece in pieces)
+                + sum(len(overlay) for overlay in self._overlays.values()))
+
+
+class WheelCache:
+    """
+    (칸 구성, 크기, 색상, 비율)별 WheelGeometry LRU 캐시.
+    남은 번호가 바뀌지 않는 한 (애니메이션 중 등) 같은 바퀴 그림과 HTML 조각을 다시 씁니다.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def geometry(self, slots, size, colors=ROULETTE_COLORS, inner_ratio=0.0, label_ratio=None):
+        slots = np.asarray(slots, dtype=np.int64)
+        key = (slots.tobytes(), size, tuple(colors), inner_ratio, label_ratio)
+        with self._lock:
+            geometry = self._entries.pop(key, None)
+            if geometry is None:
+                geometry = WheelGeometry(slots, size, colors, inner_ratio, label_ratio)
+            self._entries[key] = geometry
+            self._evict()
+        return geometry
+
+    def _evict(self):
+        # 템플릿과 overlay가 나중에 늘어나므로 크기는 지울 때마다 다시 셉니다. 방금 쓴 항목 하나는 남겨 둡니다.
+        total_bytes = sum(geometry.nbytes for geometry in self._entries.values())
+        while total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total_bytes -= old.nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_wheel_cache():
+    """서버 프로세스 전체에서 공유하는 룰렛 그림 캐시. 같은 인원의 교실들은 같은 그림을 함께 씁니다."""
+    return WheelCache()
+
+
+def wheel_svg(slots, size, rotation=0.0, highlight=None, colors=ROULETTE_COLORS, inner_ratio=0.0, label_ratio=None):
+    """slots(칸 순서대로의 번호, 0은 빈 칸)를 rotation만큼 돌린 룰렛 SVG. 바퀴 그림은 캐시에서 가져옵니다."""
+    return get_wheel_cache().geometry(slots, size, colors, inner_ratio, label_ratio).svg(rotation, highlight)
+
+
+def bucketed_pie(numbers, highlight=None, max_buckets=MAX_BUCKETS):
+    """
+    Plotly 원형 차트용 (라벨, 값, 표시 글자, 강조 여부) 리스트.
+    번호가 DETAIL_LIMIT개 이하이면 번호마다 조각 하나, 그보다 많으면 묶음마다 조각 하나를 만들고
+    조각 글자는 MAX_LABELS개까지만 표시합니다.
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    if len(numbers) <= DETAIL_LIMIT:
+        labels = [f"번호 {number}" for number in numbers]
+        return labels, [1] * len(numbers), labels, [int(number) == highlight for number in numbers]
+    starts, sizes, _, first, last = bucket_slots(numbers, max_buckets)
+    label_every = max(1, math.ceil(len(starts) / MAX_LABELS))
+    labels = [f"번호 {a}~{b}" if a != b else f"번호 {a}" for a, b in zip(first, last)]
+    texts = [label if bucket % label_every == 0 else "" for bucket, label in enumerate(labels)]
+    highlighted = [highlight is not None and a <= highlight <= b for a, b in zip(first, last)]
+    return labels, sizes.tolist(), texts, highlighted